@@ -1,59 +1,156 @@
-import json
-import ast
-from core.llm_service import generate_completion
-from core.audio_io import speak_text, record_audio, transcribe_audio
-from core.feedback_generator import generate_feedback_and_scores
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from core.llm_service import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from core.structured_output import generate_structured, StructuredOutputError
+from core.resume_digest import build_resume_context, get_resume_digest
+from core.question_bank import question_bank
+from core.audio_io import speak_text, record_answer, transcribe_audio_async, SpeechPrefetcher
+from core.feedback_generator import generate_feedback_and_scores, generate_feedback_from_scores, score_answer_async, NO_RESPONSE_ANSWER
 from prompts.question_prompts import get_question_generation_prompt
+from prompts.spoken_phrases import get_round_welcome, NO_RESPONSE, ROUND_COMPLETE
+from agent.round_manager import AVAILABLE_ROUNDS
+from utils.config import FEEDBACK_MODE, QUESTION_BANK_MODE, LLM_MAX_CONCURRENT_REQUESTS
+
+QUESTION_MEMO_MAX_ENTRIES = 256
+
+# Question generation results shared across agents and sessions, keyed by
+# (resume hash, round name, number of questions). Values are Futures so a
+# round that is still being prefetched can be joined rather than requested twice.
+_question_memo = OrderedDict()
+_question_memo_lock = threading.Lock()
+# Shared by every session. Prefetches run at background priority, so they queue in the LLM scheduler
+# behind interactive calls; more threads than the in-flight request limit would only wait there too.
+_prefetch_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENT_REQUESTS, thread_name_prefix="question-prefetch")
+
+
+def _validate_questions(obj: dict, num_questions: int) -> list[str]:
+    """Checks a {"questions": [...]} object and trims it to the requested count."""
+    questions = obj.get("questions")
+    if not isinstance(questions, list) or not questions:
+        raise StructuredOutputError('"questions" must be a non-empty list of strings')
+    if not all(isinstance(q, str) and q.strip() for q in questions):
+        raise StructuredOutputError('every entry in "questions" must be a non-empty string')
+    questions = [q.strip() for q in questions]
+    if len(questions) > num_questions:
+        print(f"Warning: LLM generated {len(questions)} questions, expected {num_questions}. Using the first {num_questions}.")
+        questions = questions[:num_questions]
+    elif len(questions) < num_questions:
+        print(f"Warning: LLM generated only {len(questions)} questions, expected {num_questions}.")
+    return questions
+
 
 class InterviewAgent:
     def __init__(self, resume_text: str):
         self.resume_text = resume_text
+        self.resume_hash = hashlib.sha256(resume_text.encode("utf-8")).hexdigest()
+        self.resume_digest = get_resume_digest(resume_text) # Sections and skills, shared by every prompt
         self.interview_history = [] #
         self.current_round_info = None
         self.feedback = None
 
+    def prefetch_questions(self, rounds=None):
+        """
+        Starts generating questions for every round in the background.
+        Returns immediately; a later _generate_questions call for a prefetched round
+        just waits for (or reuses) the background result.
+        """
+        for round_info in (rounds or AVAILABLE_ROUNDS.values()):
+            self._question_future(round_info['name'], round_info['num_questions'])
+
+    def _question_future(self, round_name: str, num_questions: int) -> Future:
+        """Returns the memoized generation for this resume and round, submitting it if needed."""
+        key = (self.resume_hash, round_name, num_questions)
+        with _question_memo_lock:
+            future = _question_memo.get(key)
+            if future is not None and future.done() and (
+                    future.exception() or future.result() == self._generic_questions(round_name, num_questions)):
+                future = None # Don't keep serving a failed generation; try again
+            if future is None:
+                future = _prefetch_executor.submit(self._assemble_questions, round_name, num_questions,
+                                                   PRIORITY_BACKGROUND)
+                _question_memo[key] = future
+                while len(_question_memo) > QUESTION_MEMO_MAX_ENTRIES:
+                    _question_memo.popitem(last=False)
+            _question_memo.move_to_end(key)
+        return future
+
     def _generate_questions(self, round_name: str, num_questions: int) -> list[str]:
-        """Generates questions for the specified round using LLM."""
-        print(f"\nGenerating {num_questions} questions for the {round_name} round based on your resume...")
-        prompt = get_question_generation_prompt(self.resume_text, round_name, num_questions)
-        raw_response = generate_completion(prompt, max_tokens=300 * num_questions, temperature=0.6) # Allow more tokens
+        """
+        Returns questions for the round, reusing a prefetched or memoized result when available.
+        A prefetch that hasn't started yet (queued behind other sessions' prefetches) is cancelled
+        and the questions are generated right away at interactive priority instead.
+        """
+        key = (self.resume_hash, round_name, num_questions)
+        while True:
+            future = self._question_future(round_name, num_questions)
+            generate_inline = False
+            with _question_memo_lock:
+                if not future.done() and future.cancel():
+                    future = Future()
+                    future.set_running_or_notify_cancel() # Running, so nobody else can cancel it
+                    _question_memo[key] = future # Others asking for this round join the inline generation
+                    generate_inline = True
+            if generate_inline:
+                try:
+                    future.set_result(self._assemble_questions(round_name, num_questions, PRIORITY_INTERACTIVE))
+                except Exception as e:
+                    future.set_exception(e)
+            elif future.done():
+                print(f"Using prefetched questions for the {round_name} round.")
+            try:
+                return list(future.result())
+            except CancelledError:
+                continue # Another caller took over this prefetch; join its generation
 
-        # Try to parse the response as a Python list
-        try:
-            # Clean potential markdown/fences
-            raw_response = raw_response.strip().strip('```python').strip('```').strip()
-            questions = ast.literal_eval(raw_response) # Safer than eval
-            if isinstance(questions, list) and all(isinstance(q, str) for q in questions):
-                 # Ensure we have the correct number, truncate or pad if necessary (though LLM should follow instructions)
-                if len(questions) > num_questions:
-                    print(f"Warning: LLM generated {len(questions)} questions, expected {num_questions}. Using the first {num_questions}.")
-                    questions = questions[:num_questions]
-                elif len(questions) < num_questions:
-                     print(f"Warning: LLM generated only {len(questions)} questions, expected {num_questions}.")
-                     # Could try generating more, or just proceed
-                
-                print("Questions generated successfully.")
+    def _assemble_questions(self, round_name: str, num_questions: int,
+                            priority: int = PRIORITY_INTERACTIVE) -> list[str]:
+        """
+        Builds the question list for a round. In 'serve' mode, matching questions come from the
+        local question bank and the LLM is only asked for the shortfall; otherwise all come from the LLM.
+        """
+        skills = self.resume_digest["skills"]
+        questions = []
+        if QUESTION_BANK_MODE == "serve":
+            questions = question_bank.assemble_round(round_name, skills, num_questions)
+            print(f"Question bank supplied {len(questions)}/{num_questions} questions for the {round_name} round.")
+            if len(questions) == num_questions:
                 return questions
-            else:
-                raise ValueError("Parsed result is not a list of strings.")
-        except (SyntaxError, ValueError, TypeError) as e:
-            print(f"Error parsing questions from LLM response: {e}")
-            print(f"Raw response was: {raw_response}")
-            # Fallback: Try splitting by newline if list parsing fails and response looks like lines of questions
-            lines = [line.strip() for line in raw_response.split('\n') if line.strip()]
-            if lines and len(lines) >= num_questions // 2: # Heuristic: if we got at least half the questions as lines
-                print("Falling back to line splitting for questions.")
-                return lines[:num_questions]
-            else:
-                print("Could not generate questions properly. Using generic questions.")
-                # Generic fallback questions
-                return [
-                    f"Tell me about your experience relevant to the {round_name} role based on your resume.",
-                    "What is your biggest strength related to this area?",
-                    "Can you describe a challenge you faced and how you overcame it?",
-                    "Where do you see yourself in 5 years?",
-                    "Do you have any questions for me?" # Always good to include
-                ][:num_questions]
+
+        generated = self._request_questions(round_name, num_questions - len(questions), priority,
+                                            exclude_questions=questions)
+        # Generic fallback questions (generation failed) are never banked
+        if QUESTION_BANK_MODE in ("record", "serve") and generated != self._generic_questions(round_name, len(generated)):
+            question_bank.add_questions(round_name, generated, skills)
+        return questions + [q for q in generated if q not in questions]
+
+    def _request_questions(self, round_name: str, num_questions: int, priority: int = PRIORITY_INTERACTIVE,
+                           exclude_questions: list[str] | None = None) -> list[str]:
+        """Generates questions for the specified round using LLM, avoiding exclude_questions (e.g. banked ones)."""
+        print(f"\nGenerating {num_questions} questions for the {round_name} round based on your resume...")
+        # Same resume context for every round and for feedback, so the prompt prefix is shared
+        prompt = get_question_generation_prompt(build_resume_context(self.resume_text), round_name, num_questions,
+                                                exclude_questions)
+        questions = generate_structured(prompt, lambda obj: _validate_questions(obj, num_questions), "questions",
+                                        max_tokens=300 * num_questions, temperature=0.6, # Allow more tokens
+                                        priority=priority)
+        if not questions:
+            print("Could not generate questions properly. Using generic questions.")
+            return self._generic_questions(round_name, num_questions)
+
+        print("Questions generated successfully.")
+        return questions
+
+    def _generic_questions(self, round_name: str, num_questions: int) -> list[str]:
+        """Generic fallback questions used when the LLM output is unusable."""
+        return [
+            f"Tell me about your experience relevant to the {round_name} role based on your resume.",
+            "What is your biggest strength related to this area?",
+            "Can you describe a challenge you faced and how you overcame it?",
+            "Where do you see yourself in 5 years?",
+            "Do you have any questions for me?" # Always good to include
+        ][:num_questions]
 
 
     def conduct_round(self, round_info: dict):
@@ -64,36 +161,68 @@ class InterviewAgent:
         self.interview_history = [] # Reset history for the new round
 
         print(f"\n--- Starting {round_name} Round ---")
-        speak_text(f"Welcome to the {round_name} round. I will ask you {num_questions} questions based on your resume. Please answer clearly after I finish speaking.")
+        speak_text(get_round_welcome(round_name, num_questions))
 
         questions = self._generate_questions(round_name, num_questions)
 
-        for i, question in enumerate(questions):
-            print(f"\nQuestion {i+1}/{len(questions)}:")
-            speak_text(question)
-
-            # Record user's response
-            # Adjust duration based on question length? Or use a longer default?
-            record_duration = 30 # Let's give 30 seconds per answer initially
-            audio_file = record_audio(duration=record_duration)
+        # Render upcoming questions while the candidate is answering the current one
+        speech_prefetcher = SpeechPrefetcher(questions)
+        # Transcriptions run in the background while the next question is asked
+        pending_answers = []
+        # In incremental mode each answer is scored as soon as its transcription is ready
+        score_futures = []
+        try:
+            for i, question in enumerate(questions):
+                speech_prefetcher.advance(i)
+                print(f"\nQuestion {i+1}/{len(questions)}:")
+                speak_text(question)
 
-            answer = None
-            if audio_file:
-                answer = transcribe_audio(audio_file)
+                # Record user's response; stops as soon as they finish speaking
+                audio = record_answer()
 
-            if not answer:
-                speak_text("I didn't catch that. Let's move to the next question.")
-                answer = "[No response recorded]" # Mark as no response
+                transcription = None
+                if audio:
+                    transcription = transcribe_audio_async(audio)
+                else:
+                    speak_text(NO_RESPONSE) # Nothing was said, which we know without waiting on transcription
 
-            self.interview_history.append({"question": question, "answer": answer})
+                pending_answers.append((question, transcription))
+                if FEEDBACK_MODE == "incremental":
+                    score_futures.append(score_answer_async(self.resume_text, round_name, question, transcription))
+        finally:
+            speech_prefetcher.cancel() # Also covers a round abandoned mid-way (e.g. Ctrl+C)
 
         print(f"\n--- {round_name} Round Complete ---")
-        speak_text("Thank you. That concludes the questions for this round.")
+        speak_text(ROUND_COMPLETE) # The last transcriptions finish while this plays
+
+        self.interview_history = self._collect_answers(pending_answers)
 
         # Generate feedback for the completed round
-        self.feedback = generate_feedback_and_scores(
-            self.resume_text, round_name, self.interview_history
-        )
+        if score_futures:
+            self.feedback = generate_feedback_from_scores(
+                self.resume_text, round_name, self.interview_history, score_futures
+            )
+        else:
+            self.feedback = generate_feedback_and_scores(
+                self.resume_text, round_name, self.interview_history
+            )
+
+    def _collect_answers(self, pending_answers: list) -> list[dict]:
+        """Waits for the background transcriptions and builds the question/answer history."""
+        history = []
+        for i, (question, transcription) in enumerate(pending_answers):
+            answer = None
+            if transcription:
+                try:
+                    answer = transcription.result()
+                except Exception as e:
+                    print(f"Error transcribing answer {i+1}: {e}")
+            if not answer:
+                if transcription:
+                    print(f"Answer {i+1} could not be transcribed.")
+                answer = NO_RESPONSE_ANSWER # Mark as no response
+            history.append({"question": question, "answer": answer})
+        return history
 
     def display_feedback(self):
         """Prints the generated feedback and scores."""
@@ -112,9 +241,12 @@ class InterviewAgent:
 
         print("\n[ Scores per Question ]")
         scores = self.feedback.get("scores_per_question", [])
+        comments = self.feedback.get("comments_per_question", [])
         if scores and len(scores) == len(self.interview_history):
             for i, score in enumerate(scores):
                 print(f"  Q{i+1}: {score}/10")
+                if i < len(comments) and comments[i]:
+                    print(f"      {comments[i]}")
         elif scores:
              print(f"  (Raw scores: {scores} - Mismatch in count, check 'raw_output')") # Show if count mismatch
         else:
@@ -3,42 +3,20 @@ import os
 import time
 import traceback 
 # Import your existing modules
-from core.resume_parser import parse_resume
+from core.resume_parser import parse_resume_bytes
 from agent.round_manager import AVAILABLE_ROUNDS
 from agent.interview_agent import InterviewAgent
-from core.audio_io import speak_text, transcribe_audio # Keep transcribe_audio for potential future use
-from core.feedback_generator import generate_feedback_and_scores
-# We will *not* directly use record_audio from audio_io due to web limitations
-from utils.config import TEMP_AUDIO_FILENAME # Might still be needed for TTS temp files or future STT
+from core.audio_io import speak_text, render_speech_audio, transcribe_audio, warm_up_tts, SpeechPrefetcher # Keep transcribe_audio for potential future use
+from prompts.spoken_phrases import get_app_round_welcome, get_stock_phrases, NEXT_QUESTION, ROUND_COMPLETE_WITH_FEEDBACK
+from core.feedback_generator import generate_feedback_and_scores_stream, generate_feedback_from_scores_stream, score_answer_async
 from utils import config # To check if keys are loaded
 
 # --- Streamlit App Configuration ---
 st.set_page_config(page_title="AI Mock Interviewer", layout="wide")
 
 
-UPLOAD_DIR = "data/uploads"
 RECORDING_DIR = "data/recordings" # If you implement audio saving
 
-def save_uploaded_file(uploaded_file):
-    """Saves uploaded file temporarily for parsing."""
-    try:
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        file_path = os.path.join(UPLOAD_DIR, uploaded_file.name)
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        return file_path
-    except Exception as e:
-        st.error(f"Error saving uploaded file: {e}")
-        return None
-
-def cleanup_temp_file(file_path):
-    """Removes a specific temporary file."""
-    try:
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-    except Exception as e:
-        st.warning(f"Could not remove temporary file {file_path}: {e}")
-
 
 # --- Initialize Session State ---
 # This is crucial for Streamlit apps
@@ -58,18 +36,61 @@ if 'interview_history' not in st.session_state:
     st.session_state.interview_history = [] # List of {'question': q, 'answer': a}
 if 'feedback' not in st.session_state:
     st.session_state.feedback = None
-if 'temp_resume_path' not in st.session_state:
-     st.session_state.temp_resume_path = None # Store path for cleanup
+if 'answer_scores' not in st.session_state:
+    st.session_state.answer_scores = [] # Background per-answer scoring futures, one per history entry
+if 'pending_speech' not in st.session_state:
+    st.session_state.pending_speech = [] # Interviewer lines waiting to be sent to the browser
+if 'interviewer_audio' not in st.session_state:
+    st.session_state.interviewer_audio = None # Last clip sent to the browser
+if 'speech_prefetcher' not in st.session_state:
+    st.session_state.speech_prefetcher = None # Renders upcoming question audio in the background
 
 # --- Check API Keys ---
 keys_loaded = bool(config.OPENAI_API_KEY and config.ELEVENLABS_API_KEY)
 if not keys_loaded:
     st.error("API keys for OpenAI or ElevenLabs not found! Please check your .env file.")
     st.stop() 
+
+# --- Warm Up Interviewer Audio ---
+@st.cache_resource
+def start_tts_warm_up():
+    """Pre-renders the fixed interviewer phrases once per server process."""
+    return warm_up_tts(get_stock_phrases(list(AVAILABLE_ROUNDS.values())))
+
+start_tts_warm_up()
+
+# --- Interviewer Audio ---
+def say(text: str):
+    """
+    Speaks an interviewer line. In 'browser' delivery mode the line is queued and sent
+    to the client as an autoplaying clip, so no server thread blocks on playback.
+    """
+    if config.INTERVIEWER_AUDIO_DELIVERY == 'browser':
+        st.session_state.pending_speech.append(text)
+    else:
+        speak_text(text)
+
+def flush_interviewer_audio():
+    """
+    Renders queued lines into one clip and (re)draws the audio player.
+    Runs at the end of each script run; lines queued before an st.rerun() carry over to the next run.
+    """
+    if st.session_state.pending_speech:
+        # Render line by line so each one hits the TTS cache, then play them as one clip
+        clips = [render_speech_audio(text) for text in st.session_state.pending_speech]
+        st.session_state.pending_speech = []
+        if all(clips):
+            st.session_state.interviewer_audio = b"".join(clips)
+    if st.session_state.interviewer_audio:
+        # Re-rendered with identical arguments on every run, so Streamlit keeps the
+        # existing player instead of replaying the clip
+        audio_slot.audio(st.session_state.interviewer_audio, format="audio/mpeg", autoplay=True)
+
 # --- Main App Logic ---
 
 st.title("🎙️ AI Mock Interviewer")
 st.markdown("Upload your resume, choose an interview round, and practice with an AI interviewer!")
+audio_slot = st.empty() # Interviewer audio player (browser delivery mode)
 
 
 
@@ -80,29 +101,25 @@ if st.session_state.stage == 'upload':
     uploaded_file = st.file_uploader("Choose a resume file (PDF or DOCX)", type=['pdf', 'docx'])
 
     if uploaded_file is not None:
-        # Save and parse
-        st.session_state.temp_resume_path = save_uploaded_file(uploaded_file)
-        if st.session_state.temp_resume_path:
-            with st.spinner("Parsing resume..."):
-                st.session_state.resume_text = parse_resume(st.session_state.temp_resume_path)
-
-            if st.session_state.resume_text:
-                st.success("Resume parsed successfully!")
-
-                try:
-                    st.session_state.interview_agent = InterviewAgent(st.session_state.resume_text)
-                    st.session_state.stage = 'select_round'
-                    st.rerun() # Rerun to move to the next stage UI immediately
-                except Exception as e:
-                    st.error(f"Failed to initialize interview agent: {e}")
-                    st.session_state.resume_text = None # Reset on failure
-                    st.session_state.interview_agent = None
-                    cleanup_temp_file(st.session_state.temp_resume_path) # Clean up failed attempt's file
-                    st.session_state.temp_resume_path = None
-            else:
-                st.error("Could not extract text from the resume. Please try a different file.")
-                cleanup_temp_file(st.session_state.temp_resume_path) # Clean up failed attempt's file
-                st.session_state.temp_resume_path = None
+        # Parse straight from the upload buffer; nothing is written to disk
+        with st.spinner("Parsing resume..."):
+            st.session_state.resume_text = parse_resume_bytes(uploaded_file.getvalue(), uploaded_file.name)
+
+        if st.session_state.resume_text:
+            st.success("Resume parsed successfully!")
+
+            try:
+                st.session_state.interview_agent = InterviewAgent(st.session_state.resume_text)
+                # Generate questions for every round while the candidate is choosing one
+                st.session_state.interview_agent.prefetch_questions(AVAILABLE_ROUNDS.values())
+                st.session_state.stage = 'select_round'
+                st.rerun() # Rerun to move to the next stage UI immediately
+            except Exception as e:
+                st.error(f"Failed to initialize interview agent: {e}")
+                st.session_state.resume_text = None # Reset on failure
+                st.session_state.interview_agent = None
+        else:
+            st.error("Could not extract text from the resume. Please try a different file.")
 
 
 # --- Stage 2: Select Round ---
@@ -113,9 +130,6 @@ if st.session_state.stage == 'select_round':
     if not st.session_state.interview_agent:
          st.error("Interview agent not initialized. Please upload a resume first.")
          st.session_state.stage = 'upload' # Go back to upload stage
-         # Clean up just in case
-         cleanup_temp_file(st.session_state.temp_resume_path)
-         st.session_state.temp_resume_path = None
          st.rerun()
 
     round_options = {key: info['name'] for key, info in AVAILABLE_ROUNDS.items()}
@@ -130,6 +144,7 @@ if st.session_state.stage == 'select_round':
             selected_round_info = AVAILABLE_ROUNDS[st.session_state.selected_round_key]
             st.session_state.current_question_index = 0
             st.session_state.interview_history = []
+            st.session_state.answer_scores = []
             st.session_state.feedback = None
             
             # Generate questions for the round
@@ -149,12 +164,14 @@ if st.session_state.stage == 'select_round':
 
 
                 if st.session_state.questions:
+                    st.session_state.speech_prefetcher = SpeechPrefetcher(st.session_state.questions)
+                    st.session_state.speech_prefetcher.advance(0) # Render while the welcome line plays
                     st.session_state.stage = 'interviewing'
                     st.success(f"Questions generated. Starting the {selected_round_info['name']} round!")
                     time.sleep(1) # Give user a moment to read the message
                     # Speak welcome message for the round
                     try:
-                        speak_text(f"Welcome to the {selected_round_info['name']} round. I will ask you {len(st.session_state.questions)} questions. Let's begin with the first question.")
+                        say(get_app_round_welcome(selected_round_info['name'], len(st.session_state.questions)))
                     except Exception as e:
                         st.warning(f"Could not play welcome audio: {e}. Starting interview.")
                     st.rerun()
@@ -163,8 +180,6 @@ if st.session_state.stage == 'select_round':
             else:
                  st.error("Interview agent not found. Please restart the process by uploading the resume again.")
                  st.session_state.stage = 'upload'
-                 cleanup_temp_file(st.session_state.temp_resume_path)
-                 st.session_state.temp_resume_path = None
                  st.rerun()
         else:
             st.warning("Please select a round first.")
@@ -196,12 +211,16 @@ if st.session_state.stage == 'interviewing':
         # Use a unique key for the text_area based on the question index
         user_answer = st.text_area("Enter your answer here:", key=f"answer_q{q_index}", height=150)
         
+        # Keep the next questions' audio rendering while this one is answered
+        if st.session_state.speech_prefetcher:
+            st.session_state.speech_prefetcher.advance(q_index)
+
         # Speak the question only once per question display
         if f"spoken_q{q_index}" not in st.session_state:
              try:
                  # Use a spinner while speaking maybe?
                  # with st.spinner("Interviewer is speaking..."): # This might be annoying if long
-                 speak_text(current_question)
+                 say(current_question)
                  st.session_state[f"spoken_q{q_index}"] = True
              except Exception as e:
                  st.warning(f"Could not play question audio: {e}")
@@ -215,6 +234,14 @@ if st.session_state.stage == 'interviewing':
                     "question": current_question,
                     "answer": user_answer.strip()
                 })
+                # Score it now so the end of the round only has to summarize
+                if config.FEEDBACK_MODE == "incremental":
+                    st.session_state.answer_scores.append(score_answer_async(
+                        st.session_state.resume_text,
+                        AVAILABLE_ROUNDS[st.session_state.selected_round_key]['name'],
+                        current_question,
+                        user_answer.strip()
+                    ))
 
                 # Move to the next question
                 st.session_state.current_question_index += 1
@@ -225,7 +252,7 @@ if st.session_state.stage == 'interviewing':
                     next_question = st.session_state.questions[next_q_index]
                     try:
                          # Maybe just say "Next question." or similar to keep it shorter
-                         speak_text("Okay, thank you. Next question.")
+                         say(NEXT_QUESTION)
                          # Let Streamlit rerun handle displaying the next question text
                     except Exception as e:
                          st.warning(f"Audio notification error: {e}")
@@ -239,8 +266,11 @@ if st.session_state.stage == 'interviewing':
         # All questions answered, move to feedback stage
         st.success("All questions for this round are complete!")
         st.session_state.stage = 'feedback'
+        if st.session_state.speech_prefetcher:
+            st.session_state.speech_prefetcher.cancel()
+            st.session_state.speech_prefetcher = None
         try:
-            speak_text("Thank you. That concludes the questions for this round. I will now prepare your feedback.")
+            say(ROUND_COMPLETE_WITH_FEEDBACK)
         except Exception as e:
              st.warning(f"Audio notification error: {e}")
         st.rerun()
@@ -255,21 +285,41 @@ if st.session_state.stage == 'feedback':
 
     # Generate feedback only if it hasn't been generated yet for this round
     if not st.session_state.feedback and agent and st.session_state.interview_history:
-        with st.spinner("Generating feedback... This may take a moment."):
-            try:
-                # Generate feedback using the agent's method (or directly call the function)
-                # We need resume_text, round_name, and history from session_state
-                # Inside the 'feedback' stage in app.py
-                st.session_state.feedback = generate_feedback_and_scores( # Call the imported function directly
+        flush_interviewer_audio() # Play the closing line while feedback streams in
+        # Render feedback progressively as it streams in, then hand over to the normal display below
+        live_feedback = st.empty()
+        try:
+            feedback_data = None
+            if st.session_state.answer_scores:
+                feedback_stream = generate_feedback_from_scores_stream(
+                    resume_text=st.session_state.resume_text,
+                    round_name=round_name,
+                    qa_pairs=st.session_state.interview_history,
+                    score_futures=st.session_state.answer_scores
+                )
+            else:
+                feedback_stream = generate_feedback_and_scores_stream(
                     resume_text=st.session_state.resume_text,
                     round_name=round_name,
                     qa_pairs=st.session_state.interview_history
                 )
-                # Store feedback in agent as well if needed by its internal logic
-                # agent.feedback = st.session_state.feedback # If agent class uses self.feedback
-            except Exception as e:
-                st.error(f"Failed to generate feedback: {e}")
-                st.error(traceback.format_exc()) # Print detailed error
+            for feedback_data in feedback_stream:
+                with live_feedback.container():
+                    st.caption("Generating feedback...")
+                    if feedback_data.get("scores_per_question") and feedback_data.get("comments_per_question"):
+                        st.markdown(f"**Total Score:** {feedback_data['total_score']} / {len(st.session_state.interview_history) * 10}")
+                    st.subheader("Overall Feedback")
+                    st.markdown(feedback_data.get("overall_feedback") or "...")
+                    if feedback_data.get("suggestions"):
+                        st.subheader("Suggestions for Improvement")
+                        st.markdown(feedback_data["suggestions"])
+            st.session_state.feedback = feedback_data
+            # Store feedback in agent as well if needed by its internal logic
+            # agent.feedback = st.session_state.feedback # If agent class uses self.feedback
+        except Exception as e:
+            st.error(f"Failed to generate feedback: {e}")
+            st.error(traceback.format_exc()) # Print detailed error
+        live_feedback.empty()
 
 
     # Display Feedback if available
@@ -288,8 +338,11 @@ if st.session_state.stage == 'feedback':
         max_score = len(st.session_state.interview_history) * 10
 
         if scores and len(scores) == len(st.session_state.interview_history):
+            comments = feedback_data.get("comments_per_question", [])
             for i, score in enumerate(scores):
                 st.markdown(f"- **Q{i+1}:** {score}/10")
+                if i < len(comments) and comments[i]:
+                    st.caption(comments[i])
         elif scores:
              st.warning(f"Note: Number of scores ({len(scores)}) doesn't match number of questions ({len(st.session_state.interview_history)}). Displaying raw scores: {scores}")
         else:
@@ -315,11 +368,15 @@ if st.session_state.stage == 'feedback':
     st.markdown("---")
     if st.button("Start Another Round"):
         # Reset state for a new round, keeping resume and agent
+        if st.session_state.speech_prefetcher:
+            st.session_state.speech_prefetcher.cancel()
+        st.session_state.speech_prefetcher = None
         st.session_state.stage = 'select_round'
         st.session_state.selected_round_key = None
         st.session_state.questions = []
         st.session_state.current_question_index = 0
         st.session_state.interview_history = []
+        st.session_state.answer_scores = []
         st.session_state.feedback = None
         # Clear spoken flags for questions
         keys_to_clear = [k for k in st.session_state if k.startswith('spoken_q')]
@@ -329,13 +386,18 @@ if st.session_state.stage == 'feedback':
 
     if st.button("Upload New Resume"):
          # Reset everything including resume and agent
-        cleanup_temp_file(st.session_state.temp_resume_path) # Clean up the old resume file
+        if st.session_state.speech_prefetcher:
+            st.session_state.speech_prefetcher.cancel()
         for key in list(st.session_state.keys()):
              del st.session_state[key] # Clear all session state
         st.session_state.stage = 'upload' # Go back to start
         st.rerun()
 
 
+# Send lines queued during this run (e.g. the current question) to the browser
+flush_interviewer_audio()
+
+
 # --- Sidebar Info ---
 st.sidebar.header("About")
 st.sidebar.info(
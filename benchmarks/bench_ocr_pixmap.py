@@ -0,0 +1,111 @@
+"""
+Micro-benchmark for the pixmap -> Tesseract hand-off used by OCR.
+
+Compares the old path (pixmap -> PNG bytes -> PIL decode -> PNG temp file for
+Tesseract) with the path in core.resume_parser (zero-copy image -> uncompressed
+temp file), reporting per-page wall time and peak RSS for each. Both paths render
+the same grayscale pixmap, so only the hand-off differs.
+
+Each variant runs in its own fresh process, because pixmap and decoded image
+buffers live outside the Python heap: peak RSS (getrusage) sees them,
+tracemalloc does not.
+
+Usage:
+    python -m benchmarks.bench_ocr_pixmap data/uploads/resume1.pdf [--dpi 200] [--ocr]
+
+By default the full hand-off is timed, including the temp file pytesseract
+writes for Tesseract, but not Tesseract itself; --ocr adds the Tesseract run.
+"""
+import argparse
+import io
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+import pytesseract
+from PIL import Image
+
+from core.resume_parser import OCR_LANG, TESSERACT_INPUT_FORMAT, pixmap_to_image
+
+
+def _render(page, dpi: int) -> "fitz.Pixmap":
+    return page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+
+
+def _hand_off(img: Image.Image, run_ocr: bool):
+    """Passes the image to Tesseract, or (without run_ocr) just writes pytesseract's temp input file."""
+    if run_ocr:
+        pytesseract.image_to_string(img, lang=OCR_LANG)
+    else:
+        with pytesseract.pytesseract.save(img):
+            pass
+
+
+def png_roundtrip_page(page, dpi: int, run_ocr: bool):
+    """The original conversion: encode the pixmap to PNG and decode it again."""
+    pix = _render(page, dpi)
+    img = Image.open(io.BytesIO(pix.tobytes("png")))
+    img.load()
+    del pix
+    _hand_off(img, run_ocr)
+
+
+def zero_copy_page(page, dpi: int, run_ocr: bool):
+    """The new conversion: wrap the pixmap's sample buffer, handed over uncompressed."""
+    pix = _render(page, dpi)
+    img = pixmap_to_image(pix)
+    try:
+        img.format = TESSERACT_INPUT_FORMAT
+        _hand_off(img, run_ocr)
+    finally:
+        img.close() # Before the pixmap is freed
+
+
+VARIANTS = {"png": png_roundtrip_page, "zero-copy": zero_copy_page}
+
+
+def _peak_rss_kib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform == "darwin" else peak # Bytes on macOS, KiB on Linux
+
+
+def run_variant(variant: str, pdf: str, dpi: int, run_ocr: bool) -> tuple[list[float], float]:
+    """Runs one variant over every page. Returns (per-page seconds, peak RSS growth in KiB)."""
+    convert = VARIANTS[variant]
+    with fitz.open(pdf) as doc:
+        baseline = _peak_rss_kib()
+        times = []
+        for page_num in range(len(doc)):
+            page = doc.load_page(page_num)
+            start = time.perf_counter()
+            convert(page, dpi, run_ocr)
+            times.append(time.perf_counter() - start)
+    return times, _peak_rss_kib() - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--ocr", action="store_true", help="Include Tesseract time in the measurement")
+    args = parser.parse_args()
+
+    results = {}
+    for variant in VARIANTS:
+        # A fresh process per variant, so one variant's peak can't hide the other's
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results[variant] = executor.submit(run_variant, variant, args.pdf, args.dpi, args.ocr).result()
+
+    (old_times, old_peak), (new_times, new_peak) = results["png"], results["zero-copy"]
+    print(f"{'page':>4}  {'png ms':>9}  {'zero-copy ms':>12}")
+    for page_num, (old_t, new_t) in enumerate(zip(old_times, new_times)):
+        print(f"{page_num + 1:>4}  {old_t * 1000:>9.1f}  {new_t * 1000:>12.1f}")
+    print(f"total: png {sum(old_times) * 1000:.1f} ms, zero-copy {sum(new_times) * 1000:.1f} ms")
+    print(f"peak RSS growth: png {old_peak:.0f} KiB, zero-copy {new_peak:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
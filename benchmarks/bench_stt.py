@@ -0,0 +1,83 @@
+"""
+Compares speech-to-text backends on a set of recorded answers.
+
+Every *.wav file in the directory is transcribed by each backend. If a
+matching *.txt file holds the reference transcript, word error rate is
+reported too. Debug recordings saved with SAVE_DEBUG_RECORDINGS=true make
+a convenient benchmark set.
+
+Usage:
+    python -m benchmarks.bench_stt data/recordings [--backends google vosk fake]
+"""
+import argparse
+import glob
+import os
+
+import speech_recognition as sr
+
+from core.stt_backends import available_stt_backends, get_stt_backend
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Levenshtein distance over words, divided by the reference length."""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_recordings(directory: str) -> list[tuple[str, sr.AudioData, str | None]]:
+    recordings = []
+    recognizer = sr.Recognizer()
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        with sr.AudioFile(path) as source:
+            audio = recognizer.record(source)
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        reference = None
+        if os.path.exists(reference_path):
+            with open(reference_path, encoding="utf-8") as f:
+                reference = f.read().strip()
+        recordings.append((os.path.basename(path), audio, reference))
+    return recordings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--backends", nargs="+", default=available_stt_backends())
+    args = parser.parse_args()
+
+    recordings = load_recordings(args.directory)
+    if not recordings:
+        print(f"No .wav files found in {args.directory}")
+        return
+
+    for name in args.backends:
+        backend = get_stt_backend(name)
+        errors = []
+        print(f"\n=== {name} ===")
+        for filename, audio, reference in recordings:
+            try:
+                text = backend.transcribe(audio) or ""
+            except Exception as e:
+                print(f"{filename}: error: {e}")
+                continue
+            line = f"{filename}: {text!r}"
+            if reference is not None:
+                errors.append(word_error_rate(reference, text))
+                line += f" (WER {errors[-1]:.2f})"
+            print(line)
+        metrics = backend.metrics()
+        if errors:
+            metrics["mean_wer"] = sum(errors) / len(errors)
+        print(metrics)
+
+
+if __name__ == "__main__":
+    main()
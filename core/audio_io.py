@@ -1,18 +1,41 @@
 import sounddevice as sd
-import soundfile as sf
 import speech_recognition as sr
 from elevenlabs.client import ElevenLabs
 from elevenlabs import play, save, Voice, VoiceSettings
 import numpy as np
+import re
+import threading
+import uuid
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
 import time
 import os
 
+from core.tts_cache import tts_cache
+from core.stt_backends import get_stt_backend
 from utils.config import (
     ELEVENLABS_API_KEY,
     ELEVENLABS_VOICE_ID,
     RECORDING_SAMPLE_RATE,
     RECORDING_CHANNELS,
-    TEMP_AUDIO_FILENAME,
+    TTS_PREFETCH_LOOKAHEAD,
+    TTS_PREFETCH_WORKERS,
+    TTS_STREAMING_ENABLED,
+    TTS_CHUNK_MAX_CHARS,
+    TTS_CHUNK_MIN_CHARS,
+    TTS_CHUNK_WORKERS,
+    TTS_OUTPUT_FORMAT,
+    RECORDING_MAX_SECONDS,
+    VAD_TRAILING_SILENCE_SECONDS,
+    VAD_START_TIMEOUT_SECONDS,
+    VAD_ENERGY_THRESHOLD,
+    VAD_NOISE_MULTIPLIER,
+    VAD_FRAME_SECONDS,
+    SPEECH_SAMPLE_RATE,
+    SAVE_DEBUG_RECORDINGS,
+    DEBUG_RECORDINGS_DIR,
+    TRANSCRIPTION_WORKERS,
+    STT_BACKEND,
 )
 
 # Initialize ElevenLabs client
@@ -25,91 +48,354 @@ except Exception as e:
 # Initialize recognizer
 r = sr.Recognizer()
 
-def speak_text(text: str):
-    """Uses ElevenLabs to convert text to speech and play it."""
+TTS_MODEL = "eleven_multilingual_v2" # Or other suitable model
+VOICE_SETTINGS_PARAMS = {"stability": 0.6, "similarity_boost": 0.85, "style": 0.1, "use_speaker_boost": True}
+VOICE_SETTINGS = VoiceSettings(**VOICE_SETTINGS_PARAMS)
+
+
+# Renders currently in progress, keyed like the TTS cache, so a speak_text call
+# for a clip that is already being prefetched waits for it instead of re-rendering.
+_inflight_renders = {}
+_inflight_lock = threading.Lock()
+_prefetch_executor = ThreadPoolExecutor(max_workers=TTS_PREFETCH_WORKERS, thread_name_prefix="tts-prefetch")
+_transcription_executor = ThreadPoolExecutor(max_workers=TRANSCRIPTION_WORKERS, thread_name_prefix="stt")
+# Separate pool for the chunks of the utterance being spoken, so they never queue behind prefetch work
+_chunk_executor = ThreadPoolExecutor(max_workers=TTS_CHUNK_WORKERS, thread_name_prefix="tts-chunk")
+
+
+def split_into_speech_chunks(text: str, max_chars: int = TTS_CHUNK_MAX_CHARS,
+                             min_chars: int = TTS_CHUNK_MIN_CHARS) -> list[str]:
+    """
+    Splits text into sentences, and over-long sentences into clauses, for chunked synthesis.
+    Very short pieces are merged into their neighbour so prosody doesn't suffer.
+    """
+    pieces = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+        else:
+            pieces.extend(re.split(r"(?<=[,;:])\s+", sentence))
+
+    chunks = []
+    for piece in (p for p in pieces if p):
+        if chunks and (len(chunks[-1]) < min_chars or len(piece) < min_chars) and len(chunks[-1]) + len(piece) < max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def _speech_units(text: str, stream: bool) -> list[str]:
+    """The clips an utterance is rendered as: sentence chunks when streaming, else the whole text."""
+    return split_into_speech_chunks(text) if stream else [text]
+
+
+def synthesize_speech(text: str) -> bytes | None:
+    """
+    Returns the rendered audio for text, from the TTS cache when possible.
+    Cache keys cover the text, voice ID, model and voice settings.
+    Concurrent requests for the same clip share a single render.
+    """
+    cache_key = tts_cache.make_key(text, ELEVENLABS_VOICE_ID, TTS_MODEL,
+                                   dict(VOICE_SETTINGS_PARAMS, output_format=TTS_OUTPUT_FORMAT))
+    audio = tts_cache.get(cache_key)
+    if audio is not None:
+        return audio
+
     if not el_client:
-        print("ElevenLabs client not initialized. Cannot speak text.")
-        print("Fallback: Printing text instead.")
-        print(f"Interviewer: {text}")
-        # Add a delay to simulate speech time
-        time.sleep(len(text.split()) / 3) # Approximate delay
-        return
+        return None
+
+    with _inflight_lock:
+        render = _inflight_renders.get(cache_key)
+        owner = render is None
+        if owner:
+            render = Future()
+            _inflight_renders[cache_key] = render
+    if not owner:
+        return render.result() # Someone else (usually the prefetcher) is rendering it
 
     try:
         print("Generating audio...")
         # Ensure ELEVENLABS_VOICE_ID exists or use a default known good one if needed
-        voice_obj = Voice(
-            voice_id=ELEVENLABS_VOICE_ID,
-            settings=VoiceSettings(stability=0.6, similarity_boost=0.85, style=0.1, use_speaker_boost=True)
-        )
-
-        audio = el_client.generate(
-            text=text,
-            voice=voice_obj,
-            model="eleven_multilingual_v2" # Or other suitable model
-        )
-        print("Speaking...")
-        play(audio)
+        voice_obj = Voice(voice_id=ELEVENLABS_VOICE_ID, settings=VOICE_SETTINGS)
+        audio = el_client.generate(text=text, voice=voice_obj, model=TTS_MODEL, output_format=TTS_OUTPUT_FORMAT)
+        if not isinstance(audio, bytes):
+            audio = b"".join(audio) # generate() returns an iterator of chunks
+        tts_cache.put(cache_key, audio)
+        render.set_result(audio)
+        return audio
+    except Exception as e:
+        render.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight_renders.pop(cache_key, None)
+
+
+class SpeechPrefetcher:
+    """
+    Renders upcoming lines (e.g. the round's questions) into the TTS cache ahead of time.
+
+    Only the next `lookahead` lines after the current position are queued, so
+    an abandoned round wastes at most that many renders; cancel() drops
+    anything not yet started.
+    """
+
+    def __init__(self, texts: list[str], lookahead: int = TTS_PREFETCH_LOOKAHEAD, stream: bool = TTS_STREAMING_ENABLED):
+        self.texts = list(texts)
+        self.lookahead = lookahead
+        self.stream = stream # Must match how speak_text will render the lines
+        self.cancelled = False
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _render(self, index: int):
+        if self.cancelled:
+            return
+        try:
+            for unit in _speech_units(self.texts[index], self.stream):
+                if self.cancelled:
+                    return
+                synthesize_speech(unit)
+        except Exception as e:
+            print(f"Warning: Could not prefetch audio for line {index + 1}: {e}")
+
+    def advance(self, index: int):
+        """Marks `index` as the line about to be spoken and queues it plus the next `lookahead` lines."""
+        with self._lock:
+            if self.cancelled:
+                return
+            for i in range(index, min(index + 1 + self.lookahead, len(self.texts))):
+                if i not in self._futures:
+                    self._futures[i] = _prefetch_executor.submit(self._render, i)
+
+    def cancel(self):
+        """Stops prefetching; renders already in progress finish and stay cached."""
+        with self._lock:
+            self.cancelled = True
+            for future in self._futures.values():
+                future.cancel()
+
+
+def warm_up_tts(phrases: list[str]) -> threading.Thread:
+    """Pre-renders fixed phrases into the TTS cache on a background thread."""
+    def render_all():
+        for phrase in phrases:
+            try:
+                for unit in _speech_units(phrase, TTS_STREAMING_ENABLED):
+                    synthesize_speech(unit)
+            except Exception as e:
+                print(f"Warning: Could not pre-render phrase '{phrase}': {e}")
+        print(f"TTS warm-up finished. Cache stats: {tts_cache.stats()}")
+
+    thread = threading.Thread(target=render_all, name="tts-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def render_speech_audio(text: str, stream: bool = TTS_STREAMING_ENABLED) -> bytes | None:
+    """
+    Returns compressed audio (TTS_OUTPUT_FORMAT, mp3 by default) for text without playing it,
+    for delivery to a browser. Chunks are rendered concurrently and concatenated, which is
+    valid for MP3 frame streams. Returns None if any part can't be synthesized.
+    """
+    try:
+        clips = list(_chunk_executor.map(synthesize_speech, _speech_units(text, stream)))
+    except Exception as e:
+        print(f"Error during ElevenLabs TTS: {e}")
+        return None
+    if any(clip is None for clip in clips):
+        return None
+    return b"".join(clips)
+
+
+def speak_text(text: str, stream: bool = TTS_STREAMING_ENABLED) -> dict | None:
+    """
+    Uses ElevenLabs to convert text to speech and play it (cached clips play without a network call).
+    With stream=True the text is split into sentence chunks that are synthesized concurrently,
+    and playback starts as soon as the first chunk is ready.
+    Returns timing metrics ({'time_to_first_audio', 'total_time', 'chunks'}), or None on fallback.
+    """
+    start = time.perf_counter()
+    units = _speech_units(text, stream)
+    try:
+        # Later chunks keep rendering while earlier ones play
+        renders = [_chunk_executor.submit(synthesize_speech, unit) for unit in units]
+        time_to_first_audio = None
+        for render in renders:
+            audio = render.result()
+            if audio is None: # Not cached and no client to render it
+                print("ElevenLabs client not initialized. Cannot speak text.")
+                print("Fallback: Printing text instead.")
+                print(f"Interviewer: {text}")
+                # Add a delay to simulate speech time
+                time.sleep(len(text.split()) / 3) # Approximate delay
+                return None
+            if time_to_first_audio is None:
+                time_to_first_audio = time.perf_counter() - start
+                print(f"Speaking... (time to first audio: {time_to_first_audio * 1000:.0f} ms, {len(units)} chunk(s))")
+            play(audio)
         print("Finished speaking.")
+        return {
+            "time_to_first_audio": time_to_first_audio,
+            "total_time": time.perf_counter() - start,
+            "chunks": len(units),
+        }
     except Exception as e:
         print(f"Error during ElevenLabs TTS: {e}")
         print("Fallback: Printing text instead.")
         print(f"Interviewer: {text}")
         time.sleep(len(text.split()) / 3) # Approximate delay
+        return None
+
+
+def capture_until_silence(max_duration: float = RECORDING_MAX_SECONDS,
+                          trailing_silence: float = VAD_TRAILING_SILENCE_SECONDS,
+                          start_timeout: float = VAD_START_TIMEOUT_SECONDS) -> np.ndarray | None:
+    """
+    Captures microphone audio with energy-based endpointing.
+
+    Frames arrive through a sounddevice.InputStream callback. The first few frames
+    calibrate the noise floor (capped at VAD_ENERGY_THRESHOLD); a frame is speech if its
+    RMS exceeds both VAD_ENERGY_THRESHOLD and VAD_NOISE_MULTIPLIER x the noise floor. Capture stops
+    once speech is followed by `trailing_silence` seconds of quiet, when
+    `max_duration` is reached, or if nobody speaks within `start_timeout`.
+    Returns float32 samples (frames x channels), or None if no speech was heard.
+    """
+    frame_size = int(RECORDING_SAMPLE_RATE * VAD_FRAME_SECONDS)
+    calibration_frames = max(1, int(0.3 / VAD_FRAME_SECONDS))
+    blocks = []
+    state = {"frames": 0, "noise": [], "speech_started": False, "silent_samples": 0, "last_speech_end": 0}
+    finished = threading.Event()
 
+    def callback(indata, frames, time_info, status):
+        if status:
+            print(f"Recording status: {status}")
+        blocks.append(indata.copy())
+        state["frames"] += frames
+        rms = float(np.sqrt(np.mean(np.square(indata))))
 
-def record_audio(duration: int = 15, filename: str = TEMP_AUDIO_FILENAME) -> str | None:
-    """Records audio from the microphone for a specified duration."""
-    print(f"\n🎙️ Recording for {duration} seconds... Speak clearly into the microphone.")
+        if len(state["noise"]) < calibration_frames and not state["speech_started"]:
+            state["noise"].append(rms)
+        # Capped, so a candidate who starts talking during calibration can't raise the threshold above their own voice
+        noise_floor = min(float(np.median(state["noise"])), VAD_ENERGY_THRESHOLD) if state["noise"] else 0.0
+        threshold = max(VAD_ENERGY_THRESHOLD, noise_floor * VAD_NOISE_MULTIPLIER)
+
+        if rms > threshold:
+            state["speech_started"] = True
+            state["silent_samples"] = 0
+            state["last_speech_end"] = state["frames"]
+        elif state["speech_started"]:
+            state["silent_samples"] += frames
+
+        elapsed = state["frames"] / RECORDING_SAMPLE_RATE
+        if (state["speech_started"] and state["silent_samples"] >= trailing_silence * RECORDING_SAMPLE_RATE) \
+                or elapsed >= max_duration \
+                or (not state["speech_started"] and elapsed >= start_timeout):
+            finished.set()
+            raise sd.CallbackStop()
+
+    with sd.InputStream(samplerate=RECORDING_SAMPLE_RATE,
+                        channels=RECORDING_CHANNELS,
+                        dtype='float32',
+                        blocksize=frame_size,
+                        callback=callback):
+        finished.wait(timeout=max_duration + 1)
+
+    if not state["speech_started"] or not blocks:
+        return None
+
+    recording = np.concatenate(blocks)
+    # Keep a short tail after the last speech frame so word endings aren't clipped
+    end = min(len(recording), state["last_speech_end"] + int(0.3 * RECORDING_SAMPLE_RATE))
+    return recording[:end]
+
+
+def to_speech_pcm(recording: np.ndarray, source_rate: int = RECORDING_SAMPLE_RATE,
+                  target_rate: int = SPEECH_SAMPLE_RATE) -> bytes:
+    """
+    Converts captured float32 audio to mono 16-bit PCM at target_rate (16 kHz by default),
+    the format speech recognizers expect. A windowed-sinc low-pass filter runs before
+    resampling to avoid aliasing.
+    """
+    samples = recording.astype(np.float32)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1) # Downmix to mono
+
+    if source_rate != target_rate and len(samples) > 0:
+        if target_rate < source_rate:
+            cutoff = 0.5 * target_rate / source_rate # Normalised to the source rate
+            taps = np.arange(-32, 33)
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+            samples = np.convolve(samples, kernel / kernel.sum(), mode="same")
+        duration = len(samples) / source_rate
+        target_times = np.arange(int(duration * target_rate)) / target_rate
+        samples = np.interp(target_times, np.arange(len(samples)) / source_rate, samples)
+
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def _save_debug_recording(pcm: bytes, sample_rate: int) -> str | None:
+    """Writes a WAV copy of an answer for debugging; each recording gets a unique name."""
+    filename = os.path.join(DEBUG_RECORDINGS_DIR, f"response_{uuid.uuid4().hex}.wav")
     try:
-        # Make sure the directory exists
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        
-        recording = sd.rec(int(duration * RECORDING_SAMPLE_RATE),
-                           samplerate=RECORDING_SAMPLE_RATE,
-                           channels=RECORDING_CHANNELS,
-                           dtype='float32') # Use float32 which soundfile handles well
-        sd.wait()  # Wait until recording is finished
-
-        # Normalize if needed (optional, but can help)
-        # recording /= np.max(np.abs(recording)) if np.max(np.abs(recording)) > 0 else 1
-
-        # Save as WAV file using soundfile
-        sf.write(filename, recording, RECORDING_SAMPLE_RATE)
-
-        print(f"✅ Recording saved to {filename}")
+        os.makedirs(DEBUG_RECORDINGS_DIR, exist_ok=True)
+        with wave.open(filename, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm)
         return filename
+    except Exception as e:
+        print(f"Warning: Could not save debug recording {filename}: {e}")
+        return None
+
+
+def record_answer(max_duration: float = RECORDING_MAX_SECONDS,
+                  trailing_silence: float = VAD_TRAILING_SILENCE_SECONDS) -> sr.AudioData | None:
+    """
+    Records an answer until the candidate stops speaking (see capture_until_silence).
+    The audio stays in memory as 16 kHz mono int16 and is returned as an sr.AudioData
+    ready for transcribe_audio. Returns None if nothing was said.
+    """
+    print(f"\n🎙️ Recording (up to {max_duration:.0f} seconds)... Speak clearly into the microphone. Pause to finish.")
+    try:
+        recording = capture_until_silence(max_duration, trailing_silence)
+        if recording is None:
+            print("No speech detected.")
+            return None
+
+        pcm = to_speech_pcm(recording)
+        print(f"✅ Recorded {len(recording) / RECORDING_SAMPLE_RATE:.1f}s of audio ({len(pcm) // 1024} KiB at {SPEECH_SAMPLE_RATE} Hz)")
+        if SAVE_DEBUG_RECORDINGS:
+            debug_file = _save_debug_recording(pcm, SPEECH_SAMPLE_RATE)
+            if debug_file:
+                print(f"Debug copy saved to {debug_file}")
+        return sr.AudioData(pcm, SPEECH_SAMPLE_RATE, 2)
     except Exception as e:
         print(f"Error during audio recording: {e}")
         return None
 
-def transcribe_audio(filename: str = TEMP_AUDIO_FILENAME) -> str | None:
-    """Transcribes audio file to text using SpeechRecognition (Google Web Speech API)."""
+def transcribe_audio(audio: sr.AudioData, backend: str = STT_BACKEND) -> str | None:
+    """
+    Transcribes an in-memory answer (from record_answer) to text with the configured
+    STT backend (see core/stt_backends.py).
+    """
     print("Transcribing your response...")
-    if not os.path.exists(filename):
-        print(f"Error: Audio file not found for transcription: {filename}")
-        return None
+    return _recognize(audio, backend)
 
-    with sr.AudioFile(filename) as source:
-        try:
-            audio_data = r.record(source) # Read the entire audio file
-            # Use Google Web Speech API for transcription
-            text = r.recognize_google(audio_data)
+
+def transcribe_audio_async(audio: sr.AudioData, backend: str = STT_BACKEND) -> Future:
+    """Queues transcribe_audio on the transcription pool; the Future resolves to the text or None."""
+    return _transcription_executor.submit(transcribe_audio, audio, backend)
+
+
+def _recognize(audio_data: sr.AudioData, backend: str) -> str | None:
+    try:
+        text = get_stt_backend(backend).transcribe(audio_data)
+        if text:
             print(f"🎤 You said: {text}")
-            return text
-        except sr.UnknownValueError:
-            print("❓ Google Speech Recognition could not understand audio")
-            return None
-        except sr.RequestError as e:
-            print(f"Could not request results from Google Speech Recognition service; {e}")
-            return None
-        except Exception as e:
-            print(f"An unexpected error occurred during transcription: {e}")
-            return None
-        finally:
-            # Clean up the temporary file
-            try:
-                if os.path.exists(filename):
-                    os.remove(filename)
-            except Exception as e:
-                print(f"Warning: Could not delete temp audio file {filename}: {e}")
\ No newline at end of file
+        return text
+    except Exception as e:
+        print(f"An unexpected error occurred during transcription: {e}")
+        return None
@@ -0,0 +1,95 @@
+import os
+import threading
+
+
+class DiskLRUCache:
+    """Directory of cache entries, one file per key, bounded by total size.
+
+    Each entry's mtime doubles as its LRU timestamp, which lets the cache
+    survive restarts without a separate index. Used as the storage layer of
+    the resume and TTS caches.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, extension: str, label: str):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.label = label # Names the cache in warnings
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{self.extension}")
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the stored bytes for the key, or None on a miss."""
+        path = self._entry_path(key)
+        with self._lock:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path, None) # Mark as most recently used
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            except Exception as e:
+                print(f"Warning: Could not read {self.label} cache entry {path}: {e}")
+                self.misses += 1
+                return None
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        """Stores bytes under the key and evicts old entries if over budget."""
+        path = self._entry_path(key)
+        with self._lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path) # Atomic, so readers never see partial entries
+            except Exception as e:
+                print(f"Warning: Could not write {self.label} cache entry {path}: {e}")
+                return
+            self._evict()
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes. Caller holds the lock."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            # Skip entries still being written and hidden files; any other extension counts, so
+            # entries left behind by an older setting (e.g. another audio format) still age out
+            if name.endswith(".tmp") or name.startswith("."):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort() # Oldest access first
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for the current process."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
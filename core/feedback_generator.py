@@ -1,65 +1,196 @@
-from core.llm_service import generate_completion
-from prompts.feedback_prompts import get_feedback_prompt
-import re # For parsing score
+from concurrent.futures import Future, ThreadPoolExecutor
+from core.llm_service import generate_completion, is_error_response, PRIORITY_BACKGROUND
+from core.structured_output import (
+    generate_structured, resolve_structured, partial_json_string,
+    require_text, require_score, StructuredOutputError,
+)
+from core.resume_digest import build_resume_context
+from prompts.feedback_prompts import get_feedback_prompt, get_answer_scoring_prompt, get_round_summary_prompt
+from utils.config import SCORING_WORKERS, LLM_JSON_MODE
+
+FEEDBACK_TEMPERATURE = 0.5 # More factual feedback
+NO_RESPONSE_ANSWER = "[No response recorded]"
+
+_scoring_executor = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="answer-scoring")
+
+
+def _validate_feedback(obj: dict, num_questions: int) -> dict:
+    """Checks a full round feedback object; the total is computed here, never taken from the model."""
+    scores = obj.get("scores")
+    if not isinstance(scores, list) or len(scores) != num_questions:
+        raise StructuredOutputError(f'"scores" must be a list of exactly {num_questions} scores, one per question')
+    scores = [require_score(score, f"scores[{i}]") for i, score in enumerate(scores)]
+    return {
+        "overall_feedback": require_text(obj, "overall_feedback"),
+        "suggestions": require_text(obj, "suggestions"),
+        "scores_per_question": scores,
+        "total_score": sum(scores),
+    }
+
+
+def _validate_answer_score(obj: dict) -> dict:
+    return {"score": require_score(obj.get("score"), '"score"'), "comment": require_text(obj, "comment")}
+
+
+def _validate_summary(obj: dict) -> dict:
+    return {"overall_feedback": require_text(obj, "overall_feedback"), "suggestions": require_text(obj, "suggestions")}
+
+
+def _empty_feedback(raw_feedback: str, partial: bool = False) -> dict:
+    return {
+        "overall_feedback": "" if partial else "Could not parse feedback.",
+        "suggestions": "" if partial else "Could not parse suggestions.",
+        "scores_per_question": [],
+        "total_score": 0,
+        "raw_output": raw_feedback # Include raw output for debugging
+    }
+
+
+def _feedback_result(validated: dict | None, raw_feedback: str) -> dict:
+    """Builds the feedback dict returned to callers from a validated object (None if unusable)."""
+    feedback_data = _empty_feedback(raw_feedback)
+    if validated is None:
+        if is_error_response(raw_feedback):
+            feedback_data["overall_feedback"] = "Feedback could not be generated right now. Please try again in a moment."
+        return feedback_data
+    feedback_data.update(validated)
+    return feedback_data
+
 
 def generate_feedback_and_scores(resume_text: str, round_name: str, qa_pairs: list[dict]) -> dict:
     """Generates feedback, suggestions, and scores using the LLM."""
     print("\nGenerating feedback based on your interview...")
-    prompt = get_feedback_prompt(resume_text, round_name, qa_pairs)
+    prompt = get_feedback_prompt(build_resume_context(resume_text), round_name, qa_pairs)
+
+    # Feedback can queue behind interactive question generation
+    raw_feedback = generate_completion(prompt, task="feedback", temperature=FEEDBACK_TEMPERATURE,
+                                       priority=PRIORITY_BACKGROUND, json_mode=LLM_JSON_MODE)
+    validated = resolve_structured(raw_feedback, prompt, lambda obj: _validate_feedback(obj, len(qa_pairs)), "feedback",
+                                   temperature=FEEDBACK_TEMPERATURE, priority=PRIORITY_BACKGROUND)
+    print("Feedback generated.")
+    return _feedback_result(validated, raw_feedback)
 
-    raw_feedback = generate_completion(prompt, max_tokens=1000, temperature=0.5) # More factual feedback
 
-    # Basic parsing (can be improved with more robust methods)
+def generate_feedback_and_scores_stream(resume_text: str, round_name: str, qa_pairs: list[dict]):
+    """
+    Streaming version of generate_feedback_and_scores.
+    Yields partially parsed feedback dicts as the JSON arrives (text fields fill in as they stream),
+    and finally the validated result, which is the same as the non-streaming call.
+    """
+    print("\nGenerating feedback based on your interview (streaming)...")
+    prompt = get_feedback_prompt(build_resume_context(resume_text), round_name, qa_pairs)
+
+    raw_feedback = ""
+    for delta in generate_completion(prompt, task="feedback", temperature=FEEDBACK_TEMPERATURE,
+                                     priority=PRIORITY_BACKGROUND, stream=True, json_mode=LLM_JSON_MODE):
+        raw_feedback += delta
+        yield parse_partial_feedback(raw_feedback)
+
+    validated = resolve_structured(raw_feedback, prompt, lambda obj: _validate_feedback(obj, len(qa_pairs)), "feedback",
+                                   temperature=FEEDBACK_TEMPERATURE, priority=PRIORITY_BACKGROUND)
+    print("Feedback generated.")
+    yield _feedback_result(validated, raw_feedback)
+
+
+def parse_partial_feedback(raw_feedback: str) -> dict:
+    """
+    Reads the feedback dict from JSON that is still streaming in: the text fields as far as
+    they have arrived, with scores left empty until the validated result replaces it.
+    """
+    feedback_data = _empty_feedback(raw_feedback, partial=True)
+    if is_error_response(raw_feedback):
+        feedback_data["overall_feedback"] = "Feedback could not be generated right now. Please try again in a moment."
+        return feedback_data
+    feedback_data["overall_feedback"] = partial_json_string(raw_feedback, "overall_feedback")
+    feedback_data["suggestions"] = partial_json_string(raw_feedback, "suggestions")
+    return feedback_data
+
+
+# --- Incremental scoring: each answer is scored when submitted, the round end only summarizes ---
+
+def score_answer(resume_text: str, round_name: str, question: str, answer: str) -> dict:
+    """Scores a single answer. Returns {'score': int | None, 'comment': str}."""
+    prompt = get_answer_scoring_prompt(build_resume_context(resume_text), round_name, question, answer)
+    result = generate_structured(prompt, _validate_answer_score, "answer_score",
+                                 temperature=FEEDBACK_TEMPERATURE, priority=PRIORITY_BACKGROUND)
+    return result or {"score": None, "comment": ""}
+
+
+def score_answer_async(resume_text: str, round_name: str, question: str, answer: "str | Future") -> Future:
+    """
+    Scores an answer in the background. `answer` may itself be a Future (e.g. a pending
+    transcription) resolving to the text or None, in which case scoring starts once it resolves.
+    """
+    def run():
+        text = answer.result() if isinstance(answer, Future) else answer
+        return score_answer(resume_text, round_name, question, text or NO_RESPONSE_ANSWER)
+    return _scoring_executor.submit(run)
+
+
+def _collect_scores(resume_text: str, round_name: str, qa_pairs: list[dict], score_futures: list[Future]) -> list[dict] | None:
+    """Joins per-answer scores, retrying any that failed once. Returns None if some are still missing."""
+    scored = []
+    for item, future in zip(qa_pairs, score_futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error scoring answer: {e}")
+            result = {"score": None, "comment": ""}
+        if result["score"] is None:
+            result = score_answer(resume_text, round_name, item["question"], item["answer"])
+        if result["score"] is None:
+            return None
+        scored.append(dict(item, **result))
+    return scored
+
+
+def generate_feedback_from_scores_stream(resume_text: str, round_name: str, qa_pairs: list[dict],
+                                         score_futures: list[Future]):
+    """
+    Streaming end-of-round feedback for incrementally scored answers.
+    Scores are aggregated locally and yielded right away; only the short summary
+    (overall feedback and suggestions) is generated, and it streams in afterwards.
+    Falls back to the full round feedback call if per-answer scores are unavailable.
+    """
+    scored = _collect_scores(resume_text, round_name, qa_pairs, score_futures) if len(score_futures) == len(qa_pairs) else None
+    if scored is None:
+        print("Per-answer scores unavailable. Falling back to full round feedback.")
+        yield from generate_feedback_and_scores_stream(resume_text, round_name, qa_pairs)
+        return
+
+    scores = [item["score"] for item in scored]
     feedback_data = {
-        "overall_feedback": "Could not parse feedback.",
-        "suggestions": "Could not parse suggestions.",
-        "scores_per_question": [],
-        "total_score": 0,
-        "raw_output": raw_feedback # Include raw output for debugging
+        "overall_feedback": "",
+        "suggestions": "",
+        "scores_per_question": scores,
+        "comments_per_question": [item["comment"] for item in scored],
+        "total_score": sum(scores),
+        "raw_output": "",
     }
+    yield dict(feedback_data)
 
-    try:
-        # Extract Overall Feedback
-        overall_match = re.search(r"Overall Feedback:(.*?)(Suggestions:|$)", raw_feedback, re.IGNORECASE | re.DOTALL)
-        if overall_match:
-            feedback_data["overall_feedback"] = overall_match.group(1).strip()
-
-        # Extract Suggestions
-        suggestions_match = re.search(r"Suggestions:(.*?)(Scores per Question:|Total Score:|$)", raw_feedback, re.IGNORECASE | re.DOTALL)
-        if suggestions_match:
-            feedback_data["suggestions"] = suggestions_match.group(1).strip()
-
-        # Extract Scores per Question (assuming format like "Q1 Score: 8/10")
-        scores = []
-        # Look for lines starting with Q followed by a number, then Score:, then number/10
-        score_matches = re.findall(r"Q\d+ Score:\s*(\d+)\s*/\s*10", raw_feedback, re.IGNORECASE)
-        if score_matches:
-            scores = [int(s) for s in score_matches]
-            # Ensure number of scores matches number of questions
-            if len(scores) == len(qa_pairs):
-                 feedback_data["scores_per_question"] = scores
-            else:
-                print(f"Warning: Parsed {len(scores)} scores, but expected {len(qa_pairs)}. Storing raw scores.")
-                # Store anyway, maybe user can interpret
-                feedback_data["scores_per_question"] = scores # Or could set to []
-
-        # Extract Total Score
-        total_score_match = re.search(r"Total Score:\s*(\d+)", raw_feedback, re.IGNORECASE)
-        if total_score_match:
-             # Try to parse total score directly
-            feedback_data["total_score"] = int(total_score_match.group(1))
-        elif feedback_data["scores_per_question"] and len(feedback_data["scores_per_question"]) == len(qa_pairs):
-             # If parsing failed but individual scores look okay, calculate sum
-            feedback_data["total_score"] = sum(feedback_data["scores_per_question"])
-            print("Calculated total score from individual scores.")
-        else:
-            print("Warning: Could not parse total score from LLM output.")
-            feedback_data["total_score"] = sum(feedback_data["scores_per_question"]) # Fallback
-
-
-    except Exception as e:
-        print(f"Error parsing feedback: {e}")
-        print("Returning raw feedback in 'raw_output' field.")
+    prompt = get_round_summary_prompt(build_resume_context(resume_text), round_name, scored)
+    raw_summary = ""
+    for delta in generate_completion(prompt, task="round_summary", temperature=FEEDBACK_TEMPERATURE,
+                                     priority=PRIORITY_BACKGROUND, stream=True, json_mode=LLM_JSON_MODE):
+        raw_summary += delta
+        partial = parse_partial_feedback(raw_summary)
+        feedback_data.update(overall_feedback=partial["overall_feedback"], suggestions=partial["suggestions"],
+                             raw_output=raw_summary)
+        yield dict(feedback_data)
 
+    summary = resolve_structured(raw_summary, prompt, _validate_summary, "round_summary",
+                                 temperature=FEEDBACK_TEMPERATURE, priority=PRIORITY_BACKGROUND)
+    fallback = _feedback_result(None, raw_summary)
+    feedback_data.update(summary or {"overall_feedback": fallback["overall_feedback"], "suggestions": fallback["suggestions"]})
     print("Feedback generated.")
-    return feedback_data
\ No newline at end of file
+    yield feedback_data
+
+
+def generate_feedback_from_scores(resume_text: str, round_name: str, qa_pairs: list[dict],
+                                  score_futures: list[Future]) -> dict:
+    """Blocking version of generate_feedback_from_scores_stream; returns the final feedback dict."""
+    feedback_data = None
+    for feedback_data in generate_feedback_from_scores_stream(resume_text, round_name, qa_pairs, score_futures):
+        pass
+    return feedback_data
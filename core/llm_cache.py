@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.config import LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES
+
+
+class LLMCache:
+    """SQLite-backed cache of LLM completions.
+
+    Entries are keyed on everything that determines the response (model,
+    messages, temperature, max_tokens), expire after ttl_seconds, and are
+    evicted least-recently-used once more than max_entries are stored.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # One shared connection guarded by our lock (Streamlit runs sessions on many threads)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_accessed ON completions(last_accessed)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, messages: list[dict], temperature: float, max_tokens: int,
+                 response_format: str | None = None) -> str:
+        """Builds the cache key from the request parameters that affect the output."""
+        params = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+        if response_format:
+            params["response_format"] = response_format # Only when set, so plain-text keys are unchanged
+        payload = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached response, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT response, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is None or now - row[1] > self.ttl_seconds:
+                    if row is not None:
+                        conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                        conn.commit()
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE completions SET last_accessed = ? WHERE key = ?", (now, key))
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: LLM cache lookup failed: {e}")
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Stores a response and trims the cache to max_entries."""
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, response, created_at, last_accessed) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+                conn.execute("DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,))
+                count = conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+                if count > self.max_entries:
+                    cursor = conn.execute(
+                        "DELETE FROM completions WHERE key IN"
+                        " (SELECT key FROM completions ORDER BY last_accessed ASC LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+                    self.evictions += cursor.rowcount
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: LLM cache write failed: {e}")
+
+    def delete(self, key: str):
+        """Drops an entry (e.g. a completion that turned out to be unusable)."""
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: LLM cache delete failed: {e}")
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for the current process."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+llm_cache = LLMCache()
@@ -1,22 +1,424 @@
+import asyncio
+import heapq
+import itertools
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Iterator
+
+import httpx
 import openai
-from utils.config import OPENAI_API_KEY
+from utils.config import (
+    OPENAI_API_KEY,
+    LLM_CACHE_ENABLED,
+    LLM_MAX_CONCURRENT_REQUESTS,
+    LLM_MAX_CONNECTIONS,
+    LLM_REQUEST_TIMEOUT_SECONDS,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+    LLM_COALESCE_REQUESTS,
+    OPENAI_BASE_URL,
+    LLM_DEFAULT_MODEL,
+    LLM_FALLBACK_MODEL,
+    LLM_QUESTIONS_MODEL,
+    LLM_FEEDBACK_MODEL,
+    LLM_SCORING_MODEL,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_MIN_DELAY_SECONDS,
+)
+from core.llm_cache import llm_cache
 
 openai.api_key = OPENAI_API_KEY
 
-def generate_completion(prompt: str, model: str = "gpt-3.5-turbo", max_tokens: int = 500, temperature: float = 0.7) -> str:
-    """Generates text completion using OpenAI API."""
+# Priority lanes for the scheduler: lower values are served first
+PRIORITY_INTERACTIVE = 0 # The candidate is waiting on this (e.g. question generation)
+PRIORITY_BACKGROUND = 10 # Can tolerate queueing (e.g. end-of-round feedback)
+
+LLM_ERROR_PREFIX = "Error:"
+
+# Task type -> primary model, fallback model and max_tokens. Explicit model/max_tokens arguments override these.
+MODEL_ROUTES = {
+    "default": {"model": LLM_DEFAULT_MODEL, "fallback": LLM_FALLBACK_MODEL, "max_tokens": 500},
+    "questions": {"model": LLM_QUESTIONS_MODEL, "fallback": LLM_FALLBACK_MODEL, "max_tokens": 1500},
+    "feedback": {"model": LLM_FEEDBACK_MODEL, "fallback": LLM_FALLBACK_MODEL, "max_tokens": 1000},
+    "answer_score": {"model": LLM_SCORING_MODEL, "fallback": LLM_FALLBACK_MODEL, "max_tokens": 120},
+    "round_summary": {"model": LLM_SCORING_MODEL, "fallback": LLM_FALLBACK_MODEL, "max_tokens": 400},
+}
+LATENCY_HISTORY_SIZE = 200 # Recent latencies kept per (task, model) for the hedging percentile
+
+# Errors worth retrying; anything else (auth, bad request) fails immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+# All OpenAI traffic runs on one background event loop, so every caller (sync
+# Streamlit threads and asyncio code alike) shares the same pooled HTTP client
+# and the same in-flight request limit.
+_loop = None
+_loop_lock = threading.Lock()
+_async_client = None
+_request_slots = None
+
+# Identical completion requests currently in flight: request key -> shared upstream task.
+# Only touched from the shared loop, so no lock is needed.
+_inflight_requests = {}
+_coalescing_totals = {"requests": 0, "deduplicated": 0}
+
+# Prompt token usage across calls, to see how much of each prompt the provider served from its prompt cache
+_usage_totals = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+
+# Upstream latencies of non-streaming requests, (task, model) -> recent seconds; and routing counters.
+# Only touched from the shared loop.
+_latency_history = {}
+_routing_totals = {"requests": 0, "hedged": 0, "hedge_wins": 0, "fallbacks": 0}
+
+
+class RateLimitScheduler:
+    """
+    Token-bucket budget for requests per minute and tokens per minute, shared by all callers.
+
+    Waiting requests are admitted strictly in (priority, arrival) order, so an
+    interactive request queued behind background work jumps ahead of it.
+    A 429 with Retry-After pauses admission for everybody, not just the caller that hit it.
+    Must only be used from the shared LLM loop.
+    """
+
+    def __init__(self, requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = LLM_TOKENS_PER_MINUTE):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self._request_budget = float(requests_per_minute)
+        self._token_budget = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = []
+        self._seq = itertools.count()
+        self._cond = None
+        self.retries = 0
+        self.throttled_waits = 0
+        self._last_retry = float("-inf")
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_budget = min(self.rpm, self._request_budget + elapsed * self.rpm / 60.0)
+        self._token_budget = min(self.tpm, self._token_budget + elapsed * self.tpm / 60.0)
+
+    def _seconds_until_available(self, tokens: int) -> float:
+        """How long until both budgets can cover the request (and any pause has ended)."""
+        wait = max(0.0, self._paused_until - time.monotonic())
+        if self._request_budget < 1:
+            wait = max(wait, (1 - self._request_budget) * 60.0 / self.rpm)
+        if self._token_budget < tokens:
+            wait = max(wait, (tokens - self._token_budget) * 60.0 / self.tpm)
+        return wait
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE):
+        """Waits until the request is at the head of the queue and within budget, then consumes it."""
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        tokens = min(tokens, self.tpm) # A single oversized request must still be admissible
+        entry = (priority, next(self._seq))
+        heapq.heappush(self._waiting, entry)
+        async with self._cond:
+            try:
+                while True:
+                    self._refill()
+                    wait = None
+                    if self._waiting[0] == entry:
+                        wait = self._seconds_until_available(tokens)
+                        if wait <= 0:
+                            heapq.heappop(self._waiting)
+                            self._request_budget -= 1
+                            self._token_budget -= tokens
+                            self._cond.notify_all() # Let the next waiter check its turn
+                            return
+                        self.throttled_waits += 1
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                # Cancelled while queued: leave the queue so others aren't stuck behind us
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                raise
+
+    def refund(self, tokens: int):
+        """Returns over-estimated tokens to the budget once actual usage is known."""
+        if tokens > 0:
+            self._token_budget = min(self.tpm, self._token_budget + tokens)
+
+    def pause(self, seconds: float):
+        """Stops admitting requests for the given time (honors Retry-After)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def record_retry(self):
+        """Notes that a request is backing off after a transient failure."""
+        self.retries += 1
+        self._last_retry = time.monotonic()
+
+    def is_throttled(self) -> bool:
+        """True while requests are paused, queued for budget, or recently backing off from errors."""
+        now = time.monotonic()
+        return (now < self._paused_until or bool(self._waiting) or self._request_budget < 1
+                or now - self._last_retry < LLM_BACKOFF_MAX_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._waiting),
+            "retries": self.retries,
+            "throttled_waits": self.throttled_waits,
+            "request_budget": round(self._request_budget, 2),
+            "token_budget": round(self._token_budget),
+        }
+
+
+scheduler = RateLimitScheduler()
+
+
+def _record_usage(usage):
+    """Logs the cached share of one call's prompt tokens and adds it to the running totals."""
+    if not usage or not usage.prompt_tokens:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+    _usage_totals["calls"] += 1
+    _usage_totals["prompt_tokens"] += usage.prompt_tokens
+    _usage_totals["cached_tokens"] += cached_tokens
+    _usage_totals["completion_tokens"] += usage.completion_tokens or 0
+    print(f"LLM usage: {usage.prompt_tokens} prompt tokens ({cached_tokens} cached, "
+          f"{cached_tokens / usage.prompt_tokens:.0%}), {usage.completion_tokens} completion tokens.")
+
+
+def prompt_cache_stats() -> dict:
+    """Token totals for this process and the fraction of prompt tokens served from the provider's prompt cache."""
+    totals = dict(_usage_totals)
+    totals["cached_ratio"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+    return totals
+
+
+def _estimate_tokens(messages: list[dict], max_tokens: int) -> int:
+    """Rough token count (about 4 characters per token) plus the completion allowance."""
+    return sum(len(m["content"]) for m in messages) // 4 + max_tokens
+
+
+def _retry_after_seconds(error: Exception) -> float | None:
+    """Reads Retry-After (or retry-after-ms) from an OpenAI error response, if present."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
     try:
-        response = openai.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=max_tokens,
-            temperature=temperature,
-            n=1,
-            stop=None,
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass # HTTP-date form; fall back to our own backoff
+    return None
+
+
+def _backoff_seconds(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+async def _create_with_retries(client: openai.AsyncOpenAI, messages: list[dict], model: str,
+                               max_tokens: int, temperature: float, priority: int, stream: bool = False,
+                               json_mode: bool = False, task: str | None = None):
+    """
+    Sends one chat completion through the scheduler, retrying transient failures.
+    With stream=True the stream object is returned once the response has started, holding a
+    request slot taken after admission (like non-streaming calls); the caller must release
+    _request_slots once it has consumed the stream, and does its own usage refund.
+    json_mode asks the API to constrain the output to a single JSON object.
+    With a task, the upstream time of each (non-streaming) call is recorded for hedging.
+    """
+    estimated_tokens = _estimate_tokens(messages, max_tokens)
+    extra_params = {"response_format": {"type": "json_object"}} if json_mode else {}
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await scheduler.acquire(estimated_tokens, priority)
+        try:
+            if stream:
+                await _request_slots.acquire()
+                try:
+                    return await client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        n=1,
+                        stop=None,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **extra_params,
+                    )
+                except BaseException:
+                    _request_slots.release() # No stream for the caller to consume
+                    raise
+            async with _request_slots:
+                # Timed here, so scheduler queueing and backoff sleeps don't count as model latency
+                sent = time.monotonic()
+                try:
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        n=1,
+                        stop=None,
+                        **extra_params,
+                    )
+                except asyncio.CancelledError:
+                    if task:
+                        _record_latency(task, model, time.monotonic() - sent) # Lower bound: a hedge won
+                    raise
+                if task:
+                    _record_latency(task, model, time.monotonic() - sent)
+        except RETRYABLE_ERRORS as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            retry_after = _retry_after_seconds(e)
+            if retry_after is not None:
+                scheduler.pause(retry_after)
+                delay = retry_after + random.uniform(0, LLM_BACKOFF_BASE_SECONDS)
+            else:
+                delay = _backoff_seconds(attempt)
+            scheduler.record_retry()
+            print(f"OpenAI call failed ({type(e).__name__}). Retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s.")
+            await asyncio.sleep(delay)
+            continue
+
+        usage = getattr(response, "usage", None)
+        if usage and usage.total_tokens:
+            scheduler.refund(estimated_tokens - usage.total_tokens)
+        _record_usage(usage)
+        return response
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Starts the shared LLM event loop on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+    return _loop
+
+
+def _get_async_client() -> openai.AsyncOpenAI:
+    """Returns the pooled async client. Must be called on the shared loop."""
+    global _async_client, _request_slots
+    if _async_client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+            timeout=LLM_REQUEST_TIMEOUT_SECONDS,
         )
+        # Retries are handled by our scheduler, so the SDK's own retry loop is disabled
+        _async_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL,
+                                           http_client=http_client, max_retries=0)
+        _request_slots = asyncio.Semaphore(LLM_MAX_CONCURRENT_REQUESTS)
+    return _async_client
+
+
+def _build_messages(prompt: str | list[dict]) -> list[dict]:
+    """Chat messages for a request. Prompts that are already message lists are sent as they are."""
+    if isinstance(prompt, list):
+        return prompt
+    return [
+        {"role": "system", "content": "You are a helpful AI assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _cache_key(model: str, messages: list[dict], temperature: float, max_tokens: int, json_mode: bool) -> str:
+    return llm_cache.make_key(model, messages, temperature, max_tokens, "json_object" if json_mode else None)
+
+
+def _error_response(e: Exception) -> str:
+    """Logs an OpenAI failure and converts it into the error string returned to callers."""
+    if isinstance(e, openai.AuthenticationError):
+        print(f"OpenAI Authentication Error: {e}")
+        print("Please check your OPENAI_API_KEY in the .env file.")
+        return "Error: OpenAI Authentication Failed."
+    if isinstance(e, openai.RateLimitError):
+        print(f"OpenAI Rate Limit Error after {LLM_MAX_RETRIES} retries: {e}")
+        return "Error: OpenAI Rate Limit Exceeded."
+    print(f"Error during OpenAI API call: {e}")
+    return f"Error: Could not generate completion - {e}"
+
+
+async def _complete(prompt: str | list[dict], task: str, model: str, fallback_model: str | None, max_tokens: int,
+                    temperature: float, use_cache: bool, bypass_cache: bool, priority: int,
+                    json_mode: bool = False) -> str:
+    """
+    Performs one completion request. Runs on the shared loop.
+    Concurrent identical requests (same model, messages, temperature, max_tokens and format)
+    share a single upstream call; the first caller's priority and cache settings apply to it.
+    """
+    if not LLM_COALESCE_REQUESTS:
+        return await _complete_uncoalesced(prompt, task, model, fallback_model, max_tokens, temperature, use_cache,
+                                           bypass_cache, priority, json_mode)
+
+    key = _cache_key(model, _build_messages(prompt), temperature, max_tokens, json_mode)
+    _coalescing_totals["requests"] += 1
+    request = _inflight_requests.get(key)
+    if request is not None:
+        _coalescing_totals["deduplicated"] += 1
+        print(f"Joined an identical in-flight LLM request ({_coalescing_totals['deduplicated']} deduplicated so far).")
+    else:
+        request = asyncio.ensure_future(_complete_uncoalesced(prompt, task, model, fallback_model, max_tokens,
+                                                              temperature, use_cache, bypass_cache, priority, json_mode))
+        _inflight_requests[key] = request
+        request.add_done_callback(lambda _: _inflight_requests.pop(key, None))
+    # Shielded, so one caller giving up doesn't cancel the request for the others
+    return await asyncio.shield(request)
+
+
+async def _complete_uncoalesced(prompt: str | list[dict], task: str, model: str, fallback_model: str | None,
+                                max_tokens: int, temperature: float, use_cache: bool, bypass_cache: bool,
+                                priority: int, json_mode: bool = False) -> str:
+    """Performs one upstream completion request (after the LLM cache). Runs on the shared loop."""
+    messages = _build_messages(prompt)
+
+    cache_key = None
+    if use_cache:
+        cache_key = _cache_key(model, messages, temperature, max_tokens, json_mode)
+        if not bypass_cache:
+            # SQLite I/O (lock, commit) runs off the shared loop so it never stalls other sessions' requests
+            cached = await asyncio.to_thread(llm_cache.get, cache_key)
+            if cached is not None:
+                print(f"LLM response served from cache. Cache stats: {llm_cache.stats()}")
+                return cached
+
+    content = await _routed_request(messages, task, model, fallback_model, max_tokens, temperature, priority,
+                                    json_mode)
+    if cache_key and not is_error_response(content):
+        await asyncio.to_thread(llm_cache.put, cache_key, content) # Only real completions are cached, never errors
+    return content
+
+
+async def _request(messages: list[dict], model: str, max_tokens: int, temperature: float, priority: int,
+                   json_mode: bool, task: str | None = None) -> str:
+    """Performs one completion request against one model. Runs on the shared loop."""
+    try:
+        client = _get_async_client()
+        response = await _create_with_retries(client, messages, model, max_tokens, temperature, priority,
+                                              json_mode=json_mode, task=task)
         # Check if response.choices exists and has items
         if response.choices and len(response.choices) > 0:
             # Check if message exists and has content
@@ -28,14 +430,251 @@ def generate_completion(prompt: str, model: str = "gpt-3.5-turbo", max_tokens: i
         else:
             print("Warning: LLM response choices list is empty.")
             return "Error: No choices in response."
-            
-    except openai.AuthenticationError as e:
-        print(f"OpenAI Authentication Error: {e}")
-        print("Please check your OPENAI_API_KEY in the .env file.")
-        return "Error: OpenAI Authentication Failed."
-    except openai.RateLimitError as e:
-        print(f"OpenAI Rate Limit Error: {e}")
-        return "Error: OpenAI Rate Limit Exceeded."
+
+    except Exception as e:
+        return _error_response(e)
+
+
+def _hedge_delay(task: str, model: str) -> float | None:
+    """
+    Seconds after which a request is hedged: the LLM_HEDGE_PERCENTILE of recent upstream latencies
+    (at least LLM_HEDGE_MIN_DELAY_SECONDS), once there are enough of them.
+    """
+    history = _latency_history.get((task, model))
+    if not LLM_HEDGE_ENABLED or not history or len(history) < LLM_HEDGE_MIN_SAMPLES:
+        return None
+    latencies = sorted(history)
+    percentile = latencies[min(len(latencies) - 1, int(len(latencies) * LLM_HEDGE_PERCENTILE / 100))]
+    return max(percentile, LLM_HEDGE_MIN_DELAY_SECONDS)
+
+
+def _record_latency(task: str, model: str, seconds: float):
+    _latency_history.setdefault((task, model), deque(maxlen=LATENCY_HISTORY_SIZE)).append(seconds)
+
+
+async def _routed_request(messages: list[dict], task: str, model: str, fallback_model: str | None, max_tokens: int,
+                          temperature: float, priority: int, json_mode: bool) -> str:
+    """
+    Sends the request to the primary model. If it is still running after the task's hedge delay, a second
+    request goes to the fallback model and whichever succeeds first wins (the other is cancelled).
+    If the primary fails and no hedge was sent, the fallback model is tried once.
+    """
+    _routing_totals["requests"] += 1
+    primary = asyncio.ensure_future(_request(messages, model, max_tokens, temperature, priority, json_mode, task))
+
+    hedge = None
+    try:
+        delay = _hedge_delay(task, model) if fallback_model else None
+        if delay is not None:
+            await asyncio.wait({primary}, timeout=delay)
+            # Under rate limiting the primary is slow because it's queued or backing off; hedging would only add load
+            if not primary.done() and not scheduler.is_throttled():
+                _routing_totals["hedged"] += 1
+                print(f"LLM {task} request on {model} exceeded p{LLM_HEDGE_PERCENTILE:g} latency ({delay:.1f}s); "
+                      f"hedging with {fallback_model}.")
+                hedge = asyncio.ensure_future(_request(messages, fallback_model, max_tokens, temperature, priority,
+                                                       json_mode, task))
+
+        pending = {primary} if hedge is None else {primary, hedge}
+        content = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                content = finished.result()
+                if not is_error_response(content):
+                    if finished is hedge:
+                        _routing_totals["hedge_wins"] += 1
+                    return content
+    finally:
+        for running in (primary, hedge):
+            if running is not None and not running.done():
+                running.cancel()
+
+    if hedge is None and fallback_model and fallback_model != model:
+        _routing_totals["fallbacks"] += 1
+        print(f"LLM {task} request on {model} failed ({content}); retrying with fallback model {fallback_model}.")
+        return await _request(messages, fallback_model, max_tokens, temperature, priority, json_mode, task)
+    return content
+
+
+async def _stream(prompt: str | list[dict], model: str, max_tokens: int, temperature: float,
+                  use_cache: bool, bypass_cache: bool, priority: int, emit, json_mode: bool = False):
+    """
+    Performs one streaming completion request, calling emit(delta) for each text delta.
+    Runs on the shared loop. A cache hit or an error is emitted as a single delta.
+    """
+    messages = _build_messages(prompt)
+
+    cache_key = None
+    if use_cache:
+        cache_key = _cache_key(model, messages, temperature, max_tokens, json_mode)
+        if not bypass_cache:
+            cached = await asyncio.to_thread(llm_cache.get, cache_key)
+            if cached is not None:
+                print(f"LLM response served from cache. Cache stats: {llm_cache.stats()}")
+                emit(cached)
+                return
+
+    parts = []
+    try:
+        client = _get_async_client()
+        # Returns holding a request slot, taken only after scheduler admission
+        stream = await _create_with_retries(client, messages, model, max_tokens, temperature, priority,
+                                            stream=True, json_mode=json_mode)
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    delta = chunk.choices[0].delta.content
+                    parts.append(delta)
+                    emit(delta)
+                if getattr(chunk, "usage", None) and chunk.usage.total_tokens:
+                    scheduler.refund(_estimate_tokens(messages, max_tokens) - chunk.usage.total_tokens)
+                    _record_usage(chunk.usage)
+        finally:
+            _request_slots.release()
     except Exception as e:
-        print(f"Error during OpenAI API call: {e}")
-        return f"Error: Could not generate completion - {e}"
\ No newline at end of file
+        # Once text has been shown we can't un-send it; the error just ends the stream
+        emit(_error_response(e) if not parts else f"\n[{_error_response(e)}]")
+        return
+
+    content = "".join(parts).strip()
+    if not content:
+        print("Warning: LLM stream produced no content.")
+        emit("Error: No content in response.")
+    elif cache_key:
+        await asyncio.to_thread(llm_cache.put, cache_key, content)
+
+
+def _resolve_route(task: str | None, model: str | None, max_tokens: int | None) -> tuple[str, str, str | None, int]:
+    """(task, model, fallback model, max_tokens) for a request; explicit model and max_tokens win over the route."""
+    task = task if task in MODEL_ROUTES else "default"
+    route = MODEL_ROUTES[task]
+    fallback_model = route["fallback"] if model is None else None # An explicitly chosen model is never swapped out
+    return task, model or route["model"], fallback_model, max_tokens or route["max_tokens"]
+
+
+async def generate_completion_async(prompt: str | list[dict], model: str | None = None, max_tokens: int | None = None,
+                                    temperature: float = 0.7, use_cache: bool = LLM_CACHE_ENABLED,
+                                    bypass_cache: bool = False, priority: int = PRIORITY_INTERACTIVE,
+                                    json_mode: bool = False, task: str | None = None) -> str:
+    """
+    Async version of generate_completion. Safe to await from any event loop;
+    the request itself runs on the shared loop with its pooled client and
+    at most LLM_MAX_CONCURRENT_REQUESTS requests in flight.
+    """
+    loop = _get_loop()
+    task, model, fallback_model, max_tokens = _resolve_route(task, model, max_tokens)
+    coro = _complete(prompt, task, model, fallback_model, max_tokens, temperature, use_cache, bypass_cache, priority,
+                     json_mode)
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def stream_completion_async(prompt: str | list[dict], model: str | None = None, max_tokens: int | None = None,
+                                  temperature: float = 0.7, use_cache: bool = LLM_CACHE_ENABLED,
+                                  bypass_cache: bool = False, priority: int = PRIORITY_INTERACTIVE,
+                                  json_mode: bool = False, task: str | None = None):
+    """Async generator yielding text deltas as the completion arrives. Safe to use from any event loop."""
+    _, model, _, max_tokens = _resolve_route(task, model, max_tokens)
+    caller_loop = asyncio.get_running_loop()
+    deltas = asyncio.Queue()
+    done = object()
+
+    def emit(delta):
+        caller_loop.call_soon_threadsafe(deltas.put_nowait, delta)
+
+    async def run():
+        try:
+            await _stream(prompt, model, max_tokens, temperature, use_cache, bypass_cache, priority, emit, json_mode)
+        finally:
+            emit(done)
+
+    future = asyncio.run_coroutine_threadsafe(run(), _get_loop())
+    try:
+        while (delta := await deltas.get()) is not done:
+            yield delta
+    finally:
+        future.cancel() # Stop the upstream request if the consumer gives up early
+
+
+def stream_completion(prompt: str | list[dict], model: str | None = None, max_tokens: int | None = None,
+                      temperature: float = 0.7, use_cache: bool = LLM_CACHE_ENABLED, bypass_cache: bool = False,
+                      priority: int = PRIORITY_INTERACTIVE, json_mode: bool = False,
+                      task: str | None = None) -> Iterator[str]:
+    """
+    Blocking generator yielding text deltas as the completion arrives.
+    Streams use the task's primary model only: text already shown can't be hedged or swapped.
+    """
+    _, model, _, max_tokens = _resolve_route(task, model, max_tokens)
+    deltas = queue.Queue()
+    done = object()
+
+    async def run():
+        try:
+            await _stream(prompt, model, max_tokens, temperature, use_cache, bypass_cache, priority, deltas.put,
+                          json_mode)
+        finally:
+            deltas.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(run(), _get_loop())
+    try:
+        while (delta := deltas.get()) is not done:
+            yield delta
+    finally:
+        future.cancel() # Stop the upstream request if the consumer gives up early
+
+
+def generate_completion(prompt: str | list[dict], model: str | None = None, max_tokens: int | None = None,
+                        temperature: float = 0.7, use_cache: bool = LLM_CACHE_ENABLED, bypass_cache: bool = False,
+                        priority: int = PRIORITY_INTERACTIVE, stream: bool = False,
+                        json_mode: bool = False, task: str | None = None) -> str | Iterator[str]:
+    """
+    Generates text completion using OpenAI API.
+    prompt is either a string (sent after a generic system message) or a full list of chat messages.
+    Thin blocking wrapper around the shared async client; call generate_completion_async to overlap requests.
+    task picks the route in MODEL_ROUTES (primary model, fallback model, max_tokens); explicit model and
+    max_tokens override it. A failed request is retried once on the fallback model, and one slower than the
+    task's LLM_HEDGE_PERCENTILE latency is hedged with a concurrent request to it.
+    With use_cache, identical requests are served from the local SQLite cache.
+    bypass_cache skips the lookup (for callers that want fresh output) but still stores the new result.
+    Requests go through the rate-limit scheduler; priority picks the lane (PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND).
+    Errors are returned as strings starting with LLM_ERROR_PREFIX; check with is_error_response.
+    With stream=True, returns a generator of text deltas instead (see stream_completion).
+    json_mode requests a single JSON object (the prompt must mention JSON); parse it with core.structured_output.
+    """
+    if stream:
+        return stream_completion(prompt, model, max_tokens, temperature, use_cache, bypass_cache, priority, json_mode,
+                                 task)
+    task, model, fallback_model, max_tokens = _resolve_route(task, model, max_tokens)
+    coro = _complete(prompt, task, model, fallback_model, max_tokens, temperature, use_cache, bypass_cache, priority,
+                     json_mode)
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def evict_cached_completion(prompt: str | list[dict], model: str | None = None, max_tokens: int | None = None,
+                            temperature: float = 0.7, json_mode: bool = False, task: str | None = None):
+    """Removes a cached completion, so output that failed validation isn't served again."""
+    if LLM_CACHE_ENABLED:
+        _, model, _, max_tokens = _resolve_route(task, model, max_tokens)
+        llm_cache.delete(_cache_key(model, _build_messages(prompt), temperature, max_tokens, json_mode))
+
+
+def routing_stats() -> dict:
+    """Routing counters plus the current hedge delay for each (task, model) with latency history."""
+    totals = dict(_routing_totals)
+    totals["hedge_delays"] = {f"{task}/{model}": _hedge_delay(task, model) for task, model in list(_latency_history)}
+    return totals
+
+
+def coalescing_stats() -> dict:
+    """How many completion requests were served by joining an identical in-flight request."""
+    totals = dict(_coalescing_totals)
+    totals["in_flight"] = len(_inflight_requests)
+    totals["dedup_rate"] = totals["deduplicated"] / totals["requests"] if totals["requests"] else 0.0
+    return totals
+
+
+def is_error_response(text: str | None) -> bool:
+    """True if generate_completion returned an error message instead of model output."""
+    return not text or text.startswith(LLM_ERROR_PREFIX)
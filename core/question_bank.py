@@ -0,0 +1,205 @@
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from core.resume_digest import KNOWN_SKILLS
+from utils.config import QUESTION_BANK_PATH, QUESTION_BANK_VECTOR_SIMILARITY, QUESTION_BANK_DUPLICATE_SIMILARITY
+
+GENERIC_SKILL = "*" # Index key for questions that don't depend on any particular skill
+VECTOR_DIMENSIONS = 512
+COMMON_CAPITALIZED = {"i", "you", "your", "what", "how", "why", "when", "where", "which", "who", "can", "could",
+                      "describe", "tell", "walk", "have", "do", "did", "is", "are", "would", "give", "explain"}
+
+
+def skills_in_text(text: str, skills: list[str]) -> list[str]:
+    """The given skills (lowercased) that are mentioned in the text as whole terms."""
+    lowered = text.lower()
+    return [skill.lower() for skill in skills
+            if re.search(r"(?<![\w+#.])" + re.escape(skill.lower()) + r"(?![\w+#])", lowered)]
+
+
+def is_reusable_question(question: str, skills: list[str]) -> bool:
+    """
+    True if the question can be asked of other candidates: it must not name resume-specific
+    entities such as companies or projects (capitalized words other than skills, acronyms and sentence starts).
+    """
+    known = {word.lower() for skill in list(skills) + list(KNOWN_SKILLS) for word in re.findall(r"[\w+#.]+", skill)}
+    for sentence in re.split(r"(?<=[.?!])\s+", question.strip()):
+        for word in re.findall(r"[A-Za-z][\w+#.'-]*", sentence)[1:]:
+            word = word.strip(".'")
+            if re.match(r"[A-Z]{2,}", word):
+                continue # Acronyms such as API, GIL or RESTful are general terms
+            if word[0].isupper() and word.lower() not in known | COMMON_CAPITALIZED:
+                return False
+    return True
+
+
+def embed_text(text: str) -> np.ndarray:
+    """Local hashed bag-of-words vector (unigrams and bigrams), L2-normalized. No model needed."""
+    words = re.findall(r"[a-z0-9+#]+", text.lower())
+    vector = np.zeros(VECTOR_DIMENSIONS, dtype=np.float32)
+    for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        vector[zlib.crc32(term.encode("utf-8")) % VECTOR_DIMENSIONS] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class QuestionBank:
+    """SQLite-backed bank of generated interview questions.
+
+    Questions are stored per round and indexed by the skills they mention
+    (an inverted index from skill to question ids); questions that mention no
+    skill are indexed as generic for their round. With vector similarity on,
+    each question also gets a local hashed bag-of-words vector, used to skip
+    near-duplicates on insert and to rank candidates against a resume.
+    """
+
+    def __init__(self, path: str = QUESTION_BANK_PATH, use_vectors: bool = QUESTION_BANK_VECTOR_SIMILARITY,
+                 duplicate_similarity: float = QUESTION_BANK_DUPLICATE_SIMILARITY):
+        self.path = path
+        self.use_vectors = use_vectors
+        self.duplicate_similarity = duplicate_similarity
+        self.served = 0
+        self.shortfalls = 0
+        self.added = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                " id INTEGER PRIMARY KEY,"
+                " round TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " vector BLOB,"
+                " served_count INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL,"
+                " UNIQUE (round, text))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS question_skills ("
+                " skill TEXT NOT NULL,"
+                " question_id INTEGER NOT NULL,"
+                " PRIMARY KEY (skill, question_id))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def add_questions(self, round_name: str, questions: list[str], skills: list[str]):
+        """Stores newly generated questions, indexed by the skills they mention (resume or known skills)."""
+        with self._lock:
+            try:
+                conn = self._connect()
+                existing = self._round_vectors(conn, round_name) if self.use_vectors else None
+                for question in questions:
+                    if not is_reusable_question(question, skills):
+                        continue
+                    vector = embed_text(question) if self.use_vectors else None
+                    if existing is not None and len(existing) and float(np.max(existing @ vector)) >= self.duplicate_similarity:
+                        continue # Near-duplicate of a banked question
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO questions (round, text, vector, created_at) VALUES (?, ?, ?, ?)",
+                        (round_name, question, vector.tobytes() if vector is not None else None, time.time()),
+                    )
+                    if not cursor.rowcount:
+                        continue
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO question_skills (skill, question_id) VALUES (?, ?)",
+                        # Any known skill counts, not just the generating resume's, or e.g. a REST question from
+                        # a Python resume would be filed as generic and served to every candidate
+                        [(skill, cursor.lastrowid)
+                         for skill in (skills_in_text(question, list(skills) + list(KNOWN_SKILLS)) or [GENERIC_SKILL])],
+                    )
+                    if vector is not None:
+                        existing = np.vstack([existing, vector]) if len(existing) else vector[np.newaxis, :]
+                    self.added += 1
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: Question bank write failed: {e}")
+
+    @staticmethod
+    def _round_vectors(conn: sqlite3.Connection, round_name: str) -> np.ndarray:
+        rows = conn.execute("SELECT vector FROM questions WHERE round = ? AND vector IS NOT NULL", (round_name,)).fetchall()
+        if not rows:
+            return np.zeros((0, VECTOR_DIMENSIONS), dtype=np.float32)
+        return np.vstack([np.frombuffer(row[0], dtype=np.float32) for row in rows])
+
+    def assemble_round(self, round_name: str, skills: list[str], num_questions: int) -> list[str]:
+        """
+        Picks up to num_questions banked questions for the round whose skills are all among
+        the resume's: those matching the most resume skills first, then those served least
+        often, then (with vectors) the closest to the resume's skill profile. Generic
+        questions fill in after skill matches.
+        """
+        keys = [skill.lower() for skill in skills] + [GENERIC_SKILL]
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            try:
+                conn = self._connect()
+                rows = conn.execute(
+                    "SELECT q.id, q.text, q.vector, q.served_count,"
+                    " SUM(CASE WHEN s.skill = ? THEN 0 ELSE 1 END) AS matches"
+                    " FROM question_skills s JOIN questions q ON q.id = s.question_id"
+                    " WHERE q.round = ?"
+                    f" AND q.id IN (SELECT question_id FROM question_skills WHERE skill IN ({placeholders}))"
+                    " GROUP BY q.id"
+                    # A question that also asks about a skill the resume lacks is not a match
+                    f" HAVING SUM(CASE WHEN s.skill IN ({placeholders}) THEN 0 ELSE 1 END) = 0",
+                    [GENERIC_SKILL, round_name] + keys + keys,
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Warning: Question bank lookup failed: {e}")
+                return []
+
+            random.shuffle(rows) # Break ties differently each time
+            profile = embed_text(f"{round_name} " + " ".join(skills)) if self.use_vectors else None
+
+            def rank(row):
+                similarity = float(np.frombuffer(row[2], dtype=np.float32) @ profile) if profile is not None and row[2] else 0.0
+                return (-row[4], row[3], -similarity)
+
+            chosen, chosen_vectors = [], []
+            for row in sorted(rows, key=rank):
+                if len(chosen) == num_questions:
+                    break
+                if self.use_vectors and row[2]:
+                    vector = np.frombuffer(row[2], dtype=np.float32)
+                    if any(float(vector @ other) >= self.duplicate_similarity for other in chosen_vectors):
+                        continue
+                    chosen_vectors.append(vector)
+                chosen.append(row)
+
+            if chosen:
+                try:
+                    conn.executemany("UPDATE questions SET served_count = served_count + 1 WHERE id = ?",
+                                     [(row[0],) for row in chosen])
+                    conn.commit()
+                except sqlite3.Error as e:
+                    print(f"Warning: Question bank update failed: {e}")
+            self.served += len(chosen)
+            if len(chosen) < num_questions:
+                self.shortfalls += 1
+            return [row[1] for row in chosen]
+
+    def stats(self) -> dict:
+        """Returns bank size and serving counters for the current process."""
+        with self._lock:
+            try:
+                size = self._connect().execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+            except sqlite3.Error:
+                size = None
+        return {"questions": size, "added": self.added, "served": self.served, "shortfalls": self.shortfalls}
+
+
+question_bank = QuestionBank()
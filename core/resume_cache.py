@@ -0,0 +1,40 @@
+import hashlib
+import json
+
+from core.disk_cache import DiskLRUCache
+from utils.config import RESUME_CACHE_DIR, RESUME_CACHE_MAX_BYTES
+
+
+class ResumeCache:
+    """On-disk, content-addressed cache of parsed resume text.
+
+    Entries are keyed by a hash of the raw file bytes plus the parser/OCR
+    settings that produced them, so changing a setting never serves stale text.
+    Each entry is a plain text file in a DiskLRUCache.
+    """
+
+    def __init__(self, cache_dir: str = RESUME_CACHE_DIR, max_bytes: int = RESUME_CACHE_MAX_BYTES):
+        self._disk = DiskLRUCache(cache_dir, max_bytes, extension="txt", label="resume")
+
+    @staticmethod
+    def make_key(file_bytes: bytes, settings: dict) -> str:
+        """Builds the cache key from the file content and parser settings."""
+        digest = hashlib.sha256(file_bytes)
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Returns cached text for the key, or None on a miss."""
+        data = self._disk.get(key)
+        return data.decode("utf-8") if data is not None else None
+
+    def put(self, key: str, text: str):
+        """Stores parsed text under the key and evicts old entries if over budget."""
+        self._disk.put(key, text.encode("utf-8"))
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for the current process."""
+        return self._disk.stats()
+
+
+resume_cache = ResumeCache()
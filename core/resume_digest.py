@@ -0,0 +1,173 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+
+from core.resume_cache import resume_cache
+from utils.config import RESUME_CONTEXT_TOKEN_BUDGET
+
+DIGEST_VERSION = 2 # Bump when segmentation or skill extraction changes, so cached digests are rebuilt
+DIGEST_MEMORY_ENTRIES = 32
+MAX_SKILLS = 30
+
+# Canonical section -> headings that introduce it (compared lowercased, without punctuation)
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "internships", "internship", "career history"),
+    "skills": ("skills", "technical skills", "key skills", "core skills", "core competencies", "competencies",
+               "technologies", "tech stack", "tools", "skills and tools"),
+    "projects": ("projects", "personal projects", "academic projects", "key projects", "selected projects"),
+    "education": ("education", "academic background", "academics", "qualifications", "education and training"),
+    "certifications": ("certifications", "certificates", "courses", "training", "awards", "achievements",
+                       "accomplishments", "publications"),
+}
+
+# Section order for context shared by every call on a resume (see prompts/system_prompts.py)
+SHARED_SECTIONS = ("summary", "experience", "projects", "skills", "education", "certifications")
+
+# Skills recognised anywhere in the resume (matched case-insensitively as whole terms)
+KNOWN_SKILLS = (
+    "Python", "Java", "JavaScript", "TypeScript", "C++", "C#", "Go", "Rust", "Kotlin", "Swift", "Ruby", "PHP",
+    "Scala", "SQL", "NoSQL", "HTML", "CSS", "Bash", "MATLAB",
+    "React", "Angular", "Vue", "Node.js", "Express", "Django", "Flask", "FastAPI", "Spring", "Spring Boot",
+    ".NET", "Rails", "GraphQL", "REST", "gRPC", "Microservices",
+    "PostgreSQL", "MySQL", "MongoDB", "Redis", "Elasticsearch", "Kafka", "RabbitMQ", "Spark", "Hadoop",
+    "Airflow", "Snowflake", "BigQuery",
+    "AWS", "Azure", "GCP", "Docker", "Kubernetes", "Terraform", "Ansible", "Jenkins", "CI/CD", "Linux", "Git",
+    "Machine Learning", "Deep Learning", "NLP", "Computer Vision", "TensorFlow", "PyTorch", "scikit-learn",
+    "Pandas", "NumPy", "LLM", "Data Analysis", "Tableau", "Power BI", "Excel",
+    "Agile", "Scrum", "Jira", "Project Management", "Leadership", "Stakeholder Management", "Communication",
+    "Mentoring", "Product Management",
+)
+_KNOWN_SKILL_LOOKUP = {skill.lower(): skill for skill in KNOWN_SKILLS}
+_KNOWN_SKILL_PATTERN = re.compile(
+    r"(?<![\w+#.])(" + "|".join(re.escape(s) for s in sorted(KNOWN_SKILLS, key=len, reverse=True)) + r")(?![\w+#])",
+    re.IGNORECASE,
+)
+
+_digest_memo = OrderedDict()
+_digest_memo_lock = threading.Lock()
+
+
+def _heading_section(line: str) -> str | None:
+    """Returns the canonical section if the line looks like a section heading."""
+    normalized = re.sub(r"[^a-z& ]", "", line.lower().replace("&", " and ")).split()
+    if not normalized or len(normalized) > 5:
+        return None
+    normalized = " ".join(normalized)
+    for section, headings in SECTION_HEADINGS.items():
+        if normalized in headings:
+            return section
+    return None
+
+
+def segment_resume(resume_text: str) -> dict:
+    """
+    Splits resume text into canonical sections (summary, experience, skills, projects,
+    education, certifications) by recognising heading lines. Text before the first
+    heading (name, contact details) is kept under 'header'.
+    """
+    sections = OrderedDict()
+    current = "header"
+    for line in resume_text.splitlines():
+        section = _heading_section(line.strip().rstrip(":"))
+        if section:
+            current = section
+            sections.setdefault(current, [])
+            continue
+        if line.strip():
+            sections.setdefault(current, []).append(line.rstrip())
+    return {name: "\n".join(lines) for name, lines in sections.items() if lines}
+
+
+# List separators, including private-use bullet glyphs (e.g. U+F0B7) that PDF extraction emits,
+# but not inside parentheses, so "AWS (S3, Lambda)" stays one item
+_SKILL_SEPARATOR_PATTERN = re.compile(r"[,;|•·\n\ue000-\uf8ff](?![^()]*\))")
+
+
+def extract_skills(resume_text: str, sections: dict) -> list[str]:
+    """Skills listed in the skills section, followed by known skills mentioned anywhere else."""
+    skills = []
+    for item in _SKILL_SEPARATOR_PATTERN.split(sections.get("skills", "")):
+        item = item.split(":")[-1].strip(" -*\t") # "Languages: Python" -> "Python"
+        if re.search(r"[^\W\d_]", item) and len(item.split()) <= 4: # Skip stray bullets and numbers
+            skills.append(item)
+    skills.extend(_KNOWN_SKILL_LOOKUP[m.lower()] for m in _KNOWN_SKILL_PATTERN.findall(resume_text))
+
+    unique = OrderedDict()
+    for skill in skills:
+        unique.setdefault(skill.lower(), skill)
+    return list(unique.values())[:MAX_SKILLS]
+
+
+def _build_digest(resume_text: str) -> dict:
+    sections = segment_resume(resume_text)
+    return {"version": DIGEST_VERSION, "sections": sections, "skills": extract_skills(resume_text, sections)}
+
+
+def get_resume_digest(resume_text: str) -> dict:
+    """
+    Returns {'sections': {...}, 'skills': [...]} for the resume. Built once per resume
+    content and cached in memory and in the on-disk resume cache.
+    """
+    cache_key = resume_cache.make_key(resume_text.encode("utf-8"), {"digest_version": DIGEST_VERSION})
+    with _digest_memo_lock:
+        if cache_key in _digest_memo:
+            _digest_memo.move_to_end(cache_key)
+            return _digest_memo[cache_key]
+
+    digest = None
+    cached = resume_cache.get(cache_key)
+    if cached is not None:
+        try:
+            digest = json.loads(cached)
+        except json.JSONDecodeError:
+            print("Warning: Ignoring unreadable cached resume digest.")
+    if digest is None:
+        digest = _build_digest(resume_text)
+        resume_cache.put(cache_key, json.dumps(digest))
+        print(f"Resume digest built: sections={list(digest['sections'])}, {len(digest['skills'])} skills.")
+
+    with _digest_memo_lock:
+        _digest_memo[cache_key] = digest
+        while len(_digest_memo) > DIGEST_MEMORY_ENTRIES:
+            _digest_memo.popitem(last=False)
+    return digest
+
+
+def _truncate_at_line(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip() + "\n..."
+
+
+def build_resume_context(resume_text: str, token_budget: int = RESUME_CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Resume text to put in a prompt: the extracted skills plus sections in priority order,
+    within token_budget (about 4 characters per token). The result is the same for every
+    call on the resume, which keeps the prompt prefix cacheable.
+    Falls back to the start of the raw text if no sections could be recognised.
+    """
+    budget_chars = token_budget * 4
+    digest = get_resume_digest(resume_text)
+    sections = digest["sections"]
+    if not any(name != "header" for name in sections):
+        return _truncate_at_line(resume_text.strip(), budget_chars)
+
+    parts = []
+    if digest["skills"]:
+        parts.append("Key Skills: " + ", ".join(digest["skills"]))
+    remaining = budget_chars - sum(len(p) for p in parts)
+    for name in SHARED_SECTIONS:
+        body = sections.get(name)
+        if not body:
+            continue
+        if remaining < 100: # Not enough room left for anything useful
+            break
+        block = _truncate_at_line(f"{name.title()}:\n{body}", remaining)
+        parts.append(block)
+        remaining -= len(block) + 2
+    return "\n\n".join(parts)
@@ -1,113 +1,527 @@
+import multiprocessing
 import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 
-import docx
 import fitz  
 import io
+import numpy as np
 from PIL import Image
 import pytesseract
 
-
+from core.resume_cache import resume_cache
 
 
 MIN_TEXT_LENGTH_THRESHOLD = 50 # Minimum characters to consider extraction successful without OCR
+MAX_RESUME_CHARS = 20000 # Extraction stops once this much text is gathered; prompts never need more
+MIN_PAGE_TEXT_LENGTH = 20 # Pages with less text-layer text than this are OCRed in hybrid mode
+OCR_IMAGE_COVERAGE = 0.25 # Pages whose images cover at least this share of the page...
+IMAGE_PAGE_MAX_TEXT_LENGTH = 200 # ...are also OCRed if their text layer is shorter than this (e.g. a scan with a caption)
+OCR_LANG = 'eng'
+OCR_DPI = 200 # Render resolution for OCR; higher is slower but more accurate
+OCR_PAGE_TIMEOUT_SECONDS = 60
+OCR_PREPROCESS = () # Optional steps applied before OCR, e.g. ('deskew', 'binarize')
+OCR_BINARIZE_THRESHOLD = 160
+OCR_MAX_WORKERS = os.cpu_count() or 1
+PDF_EXTRACTION_MODE = 'hybrid' # 'hybrid' (per-page text layer/OCR) or 'fallback' (whole-document OCR fallback)
+TESSERACT_NOT_FOUND = "tesseract_not_found"
+TESSERACT_INPUT_FORMAT = "BMP" # pytesseract writes the image to a temp file in this format; uncompressed is cheapest
+WORD_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+PARSER_VERSION = 3 # Bump when extraction logic changes so cached results are invalidated
 
-def extract_text_from_pdf_pymupdf(file_path: str) -> str | None:
-    """Extracts text from a PDF file using PyMuPDF (fitz)."""
-    try:
-        doc = fitz.open(file_path)
-        text = ""
+def get_parser_settings() -> dict:
+    """Returns the parser/OCR settings that affect extracted text (part of the cache key)."""
+    return {
+        "version": PARSER_VERSION,
+        "min_text_length": MIN_TEXT_LENGTH_THRESHOLD,
+        "max_chars": MAX_RESUME_CHARS,
+        "min_page_text_length": MIN_PAGE_TEXT_LENGTH,
+        "ocr_image_coverage": OCR_IMAGE_COVERAGE,
+        "image_page_max_text_length": IMAGE_PAGE_MAX_TEXT_LENGTH,
+        "ocr_lang": OCR_LANG,
+        "ocr_dpi": OCR_DPI,
+        "ocr_preprocess": list(OCR_PREPROCESS),
+        "ocr_binarize_threshold": OCR_BINARIZE_THRESHOLD,
+        "pdf_mode": PDF_EXTRACTION_MODE,
+    }
+
+def _open_pdf(source: str | bytes) -> "fitz.Document":
+    """Opens a PDF from a file path or from in-memory bytes."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _describe_source(source: str | bytes) -> str:
+    """Returns a printable label for a path or in-memory document."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"<in-memory document, {len(source)} bytes>"
+    return source
+
+
+def iter_pdf_page_texts(file_path: str | bytes):
+    """Yields (page_num, text) one page at a time so callers can stop early."""
+    with _open_pdf(file_path) as doc:
         for page_num in range(len(doc)):
             page = doc.load_page(page_num)
-            text += page.get_text("text") or "" # Add null check
-        doc.close()
+            yield page_num, page.get_text("text") or "" # Add null check
+
+
+def image_coverage(page: "fitz.Page") -> float:
+    """Share of the page area covered by images (overlaps counted twice, capped at 1)."""
+    rect = page.rect
+    area = rect.width * rect.height
+    if not area:
+        return 0.0
+    covered = sum((fitz.Rect(info["bbox"]) & rect).get_area() for info in page.get_image_info())
+    return min(1.0, covered / area)
+
+
+def page_needs_ocr(page_text: str, coverage: float) -> bool:
+    """True if a page's text layer is missing, or too short for a page that is mostly images."""
+    length = len(page_text.strip())
+    return length < MIN_PAGE_TEXT_LENGTH or (coverage >= OCR_IMAGE_COVERAGE and length < IMAGE_PAGE_MAX_TEXT_LENGTH)
+
+
+def extract_text_from_pdf_pymupdf(file_path: str | bytes, max_chars: int = MAX_RESUME_CHARS) -> str | None:
+    """
+    Extracts text from a PDF file (path or bytes) using PyMuPDF (fitz).
+    Stops reading pages once max_chars characters have been collected.
+    """
+    try:
+        parts = []
+        total = 0
+        for _, page_text in iter_pdf_page_texts(file_path):
+            parts.append(page_text)
+            total += len(page_text)
+            if total >= max_chars:
+                print(f"Reached the {max_chars} character budget. Skipping remaining pages.")
+                break
+        text = "".join(parts)
         print(f"PyMuPDF extracted {len(text)} characters.")
         return text
     except FileNotFoundError:
         print(f"Error: PDF file not found at {file_path}")
         return None
     except Exception as e:
-        print(f"Error reading PDF with PyMuPDF {file_path}: {e}")
+        print(f"Error reading PDF with PyMuPDF {_describe_source(file_path)}: {e}")
         return None
 
-def ocr_pdf(file_path: str) -> str | None:
-    """Extracts text from a PDF using OCR (Tesseract) as a fallback."""
-    print(f"Attempting OCR on {file_path}...")
-    text = ""
+def _print_tesseract_not_found():
+    print("\n--- Tesseract OCR Error ---")
+    print("Tesseract executable not found. Please ensure:")
+    print("1. Tesseract OCR engine is installed on your system.")
+    print("2. The 'tesseract' command is in your system's PATH.")
+    print("(On Windows, you might need to set the path manually in core/resume_parser.py)")
+    print("---------------------------\n")
+
+
+def pixmap_to_image(pix: "fitz.Pixmap") -> Image.Image:
+    """
+    Wraps a pixmap's sample buffer in a PIL image without copying or re-encoding.
+    The returned image shares memory with the pixmap: keep the pixmap alive while using it,
+    and close() the image before the pixmap is freed (PyMuPDF can't release an exported buffer).
+    """
+    mode = {1: "L", 3: "RGB", 4: "RGBA"}[pix.n]
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, pix.stride, 1)
+
+
+def _estimate_skew_angle(img: Image.Image, max_angle: float = 5.0, step: float = 0.5) -> float:
+    """Finds the rotation that maximises row-projection variance (text lines become sharp peaks)."""
+    small = img.convert("L")
+    small.thumbnail((800, 800))
+    best_angle, best_score = 0.0, -1.0
+    angle = -max_angle
+    while angle <= max_angle:
+        rotated = np.asarray(small.rotate(angle, fillcolor=255), dtype=np.float32)
+        score = float(np.var((255.0 - rotated).sum(axis=1)))
+        if score > best_score:
+            best_angle, best_score = angle, score
+        angle += step
+    return best_angle
+
+
+def preprocess_image(img: Image.Image, steps: tuple[str, ...] = ()) -> Image.Image:
+    """Applies optional OCR preprocessing steps ('deskew', 'binarize') in order."""
+    for step in steps:
+        if step == "deskew":
+            angle = _estimate_skew_angle(img)
+            if angle:
+                img = img.rotate(angle, expand=True, fillcolor=255)
+        elif step == "binarize":
+            img = img.convert("L").point(lambda p: 255 if p > OCR_BINARIZE_THRESHOLD else 0)
+        else:
+            print(f"Warning: Unknown OCR preprocessing step '{step}'. Ignoring it.")
+    return img
+
+
+# Document opened once per OCR worker process (see _init_ocr_worker)
+_worker_doc = None
+
+
+def _init_ocr_worker(file_path: str | bytes):
+    """Pool initializer: receives the PDF once per worker instead of once per page."""
+    global _worker_doc
+    _worker_doc = _open_pdf(file_path)
+
+
+def _start_ocr_pool(file_path: str | bytes, workers: int) -> ProcessPoolExecutor:
+    """Starts an OCR process pool for one document; reuse it for every page of that document."""
+    # Spawned, not forked: the calling (Streamlit) process has many threads by now
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_ocr_worker, initargs=(file_path,))
+
+
+def _ocr_worker_page(page_num: int, dpi: int, preprocess: tuple[str, ...],
+                     timeout: float) -> tuple[int, str | None, str | None]:
+    """Pool task: OCRs a page of the worker's document."""
+    return _ocr_page(_worker_doc, page_num, dpi, preprocess, timeout)
+
+
+def _ocr_page(source: "str | bytes | fitz.Document", page_num: int, dpi: int, preprocess: tuple[str, ...] = (),
+              timeout: float = OCR_PAGE_TIMEOUT_SECONDS) -> tuple[int, str | None, str | None]:
+    """
+    OCRs a single PDF page of a path, bytes or an open document.
+    Reports errors as strings instead of raising, since it usually runs in a worker process.
+    Tesseract is killed if it runs longer than timeout seconds on the page.
+    Returns (page_num, text, error).
+    """
     try:
-        doc = fitz.open(file_path)
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            # Render page to an image (pixmap)
-            # Increase DPI for better OCR quality if needed (e.g., matrix=fitz.Matrix(2, 2))
-            pix = page.get_pixmap()
-            # Convert pixmap to PIL Image
-            img_data = pix.tobytes("png") # Use PNG for lossless
-            img = Image.open(io.BytesIO(img_data))
-
-            # Perform OCR on the image
-            try:
-                 page_text = pytesseract.image_to_string(img, lang='eng') # Specify language
-                 if page_text:
-                      # print(f"OCR extracted text from page {page_num + 1}") # Debugging
-                      text += page_text + "\n"
-                 # else:
-                      # print(f"OCR found no text on page {page_num + 1}") # Debugging
-            except pytesseract.TesseractNotFoundError:
-                 print("\n--- Tesseract OCR Error ---")
-                 print("Tesseract executable not found. Please ensure:")
-                 print("1. Tesseract OCR engine is installed on your system.")
-                 print("2. The 'tesseract' command is in your system's PATH.")
-                 print("(On Windows, you might need to set the path manually in core/resume_parser.py)")
-                 print("---------------------------\n")
-                 return None # Cannot proceed without Tesseract
-            except Exception as ocr_e:
-                 print(f"Error during OCR processing on page {page_num + 1}: {ocr_e}")
-                 # Continue to next page if one page fails
-
-        doc.close()
-        print(f"OCR extraction finished, total characters: {len(text)}")
-        return text
+        # Grayscale without alpha: a third of the RGB buffer, and all Tesseract needs
+        if isinstance(source, fitz.Document):
+            pix = source.load_page(page_num).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        else:
+            with _open_pdf(source) as doc:
+                pix = doc.load_page(page_num).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        view = pixmap_to_image(pix)
+        try:
+            img = preprocess_image(view, preprocess)
+            img.format = TESSERACT_INPUT_FORMAT # Otherwise pytesseract PNG-encodes the page before every run
+            page_text = pytesseract.image_to_string(img, lang=OCR_LANG, timeout=timeout)
+        finally:
+            view.close() # Release the shared buffer before the pixmap goes, on every path
+        return page_num, page_text, None
+    except pytesseract.TesseractNotFoundError:
+        return page_num, None, TESSERACT_NOT_FOUND
+    except RuntimeError as e:
+        if "timeout" in str(e).lower(): # pytesseract's "Tesseract process timeout"
+            return page_num, None, f"timed out after {timeout}s"
+        return page_num, None, str(e)
+    except Exception as e:
+        return page_num, None, str(e)
+
+
+def ocr_pdf_pages(file_path: str | bytes, page_numbers: list[int], dpi: int = OCR_DPI,
+                  timeout: float = OCR_PAGE_TIMEOUT_SECONDS,
+                  preprocess: tuple[str, ...] = OCR_PREPROCESS,
+                  executor: ProcessPoolExecutor | None = None) -> tuple[dict[int, str] | None, bool]:
+    """
+    OCRs the given pages of a PDF in a process pool sized to the available cores.
+    Pass an executor from _start_ocr_pool to reuse one pool across calls on the same document.
+    Pages that fail, or whose Tesseract run exceeds the per-page timeout, are skipped.
+    Returns (page number -> text, complete), where complete is False if any page failed;
+    the mapping is None if Tesseract is unavailable.
+    """
+    if not page_numbers:
+        return {}, True
+
+    print(f"Attempting OCR on {len(page_numbers)} page(s) of {_describe_source(file_path)} at {dpi} DPI...")
+    results = {}
+
+    # A single page isn't worth the pool start-up cost
+    if executor is None and len(page_numbers) == 1:
+        outcomes = [_ocr_page(file_path, page_numbers[0], dpi, preprocess, timeout)]
+    else:
+        own_executor = executor is None
+        if own_executor:
+            executor = _start_ocr_pool(file_path, min(len(page_numbers), OCR_MAX_WORKERS))
+        try:
+            # The timeout is enforced per page inside the worker, so time spent queued doesn't count against it
+            futures = {executor.submit(_ocr_worker_page, n, dpi, preprocess, timeout): n for n in page_numbers}
+            outcomes = []
+            for future, page_num in futures.items():
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    outcomes.append((page_num, None, str(e)))
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+    complete = True
+    for page_num, page_text, error in outcomes:
+        if error == TESSERACT_NOT_FOUND:
+            _print_tesseract_not_found()
+            return None, False # Cannot proceed without Tesseract
+        if error:
+            print(f"Error during OCR processing on page {page_num + 1}: {error}")
+            complete = False # Continue with the other pages if one page fails
+        elif page_text:
+            results[page_num] = page_text
+
+    return results, complete
+
+
+def ocr_pdf(file_path: str | bytes, dpi: int = OCR_DPI) -> tuple[str | None, bool]:
+    """
+    Extracts text from every page of a PDF (path or bytes) using OCR (Tesseract).
+    Returns (text, complete); complete is False if any page could not be OCRed.
+    """
+    try:
+        with _open_pdf(file_path) as doc:
+            page_count = len(doc)
     except FileNotFoundError:
         print(f"Error: PDF file not found for OCR at {file_path}")
-        return None
+        return None, False
     except Exception as e:
-        print(f"Error opening PDF for OCR {file_path}: {e}")
-        return None
+        print(f"Error opening PDF for OCR {_describe_source(file_path)}: {e}")
+        return None, False
+
+    page_texts, complete = ocr_pdf_pages(file_path, list(range(page_count)), dpi=dpi)
+    if page_texts is None:
+        return None, False
+    text = "".join(page_texts[n] + "\n" for n in sorted(page_texts))
+    print(f"OCR extraction finished, total characters: {len(text)}")
+    return text, complete
+
+
+def extract_text_from_pdf_hybrid(file_path: str | bytes,
+                                 max_chars: int = MAX_RESUME_CHARS) -> tuple[str | None, bool]:
+    """
+    Extracts text from a PDF deciding per page between the text layer and OCR.
+    Pages with little or no text layer, or mostly images with a short text layer
+    (see page_needs_ocr), are OCRed in parallel batches on one process pool for the
+    document; the rest use PyMuPDF text directly.
+    Pages are read lazily and extraction stops once max_chars have been collected.
+    Returns (text, complete); complete is False if any page that needed OCR didn't get it.
+    """
+    page_texts = {}
+    pending_ocr = []
+    total = 0
+    ocr_available = True
+    complete = True
+    executor = None # Started on the first batch, so text-only PDFs never pay for it
+
+    def flush_ocr() -> int:
+        """OCRs the pending pages and returns the number of characters added."""
+        nonlocal ocr_available, complete, executor
+        added = 0
+        if pending_ocr and not ocr_available:
+            complete = False
+        if pending_ocr and ocr_available:
+            if executor is None:
+                executor = _start_ocr_pool(file_path, OCR_MAX_WORKERS)
+            ocr_texts, batch_complete = ocr_pdf_pages(file_path, pending_ocr, executor=executor)
+            complete = complete and batch_complete
+            if ocr_texts is None:
+                ocr_available = False # Tesseract missing; don't retry every batch
+            for page_num, ocr_text in (ocr_texts or {}).items():
+                # Keep the text layer if OCR did not produce anything better
+                if len(ocr_text.strip()) > len(page_texts[page_num].strip()):
+                    added += len(ocr_text) - len(page_texts[page_num])
+                    page_texts[page_num] = ocr_text + "\n"
+        pending_ocr.clear()
+        return added
+
+    try:
+        try:
+            with _open_pdf(file_path) as doc:
+                for page_num in range(len(doc)):
+                    page = doc.load_page(page_num)
+                    page_text = page.get_text("text") or ""
+                    page_texts[page_num] = page_text
+                    total += len(page_text)
+                    if page_needs_ocr(page_text, image_coverage(page)):
+                        pending_ocr.append(page_num)
+                        # OCR in batches of one page per worker so the budget can stop us early
+                        if len(pending_ocr) >= OCR_MAX_WORKERS:
+                            total += flush_ocr()
+                    if total >= max_chars:
+                        print(f"Reached the {max_chars} character budget after page {page_num + 1}. Skipping remaining pages.")
+                        break
+        except FileNotFoundError:
+            print(f"Error: PDF file not found at {file_path}")
+            return None, False
+        except Exception as e:
+            print(f"Error reading PDF with PyMuPDF {_describe_source(file_path)}: {e}")
+            return None, False
+
+        if pending_ocr:
+            print(f"{len(pending_ocr)} page(s) have little text or are mostly images. Running OCR on them.")
+            flush_ocr()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    text = "".join(page_texts[n] for n in sorted(page_texts))
+    print(f"Hybrid PDF extraction finished, total characters: {len(text)}")
+    return text, complete
+
+
+def _w(tag: str) -> str:
+    return f"{{{WORD_NAMESPACE}}}{tag}"
+
+
+def _iter_docx_part(xml_stream):
+    """
+    Streams text blocks out of one WordprocessingML part (document, header or footer).
+    Paragraphs are yielded as they close; table rows are yielded as 'cell | cell | ...'.
+    Elements are cleared as soon as they are consumed, so memory stays flat.
+    """
+    paragraph, table_row, table_cell = _w("p"), _w("tr"), _w("tc")
+    text_tag, tab_tag, break_tag = _w("t"), _w("tab"), _w("br")
+    rows = []   # Stack of cell lists, one per open table row (tables can nest)
+    cells = []  # Stack of paragraph lists, one per open table cell
+
+    for event, elem in ET.iterparse(xml_stream, events=("start", "end")):
+        if event == "start":
+            if elem.tag == table_row:
+                rows.append([])
+            elif elem.tag == table_cell:
+                cells.append([])
+            continue
+
+        if elem.tag == paragraph:
+            pieces = []
+            for node in elem.iter():
+                if node.tag == text_tag and node.text:
+                    pieces.append(node.text)
+                elif node.tag == tab_tag:
+                    pieces.append("\t")
+                elif node.tag == break_tag:
+                    pieces.append("\n")
+            text = "".join(pieces)
+            if cells:
+                cells[-1].append(text)
+            elif text:
+                yield text
+            elem.clear()
+        elif elem.tag == table_cell:
+            cell_text = " ".join(t for t in cells.pop() if t)
+            if rows:
+                rows[-1].append(cell_text)
+        elif elem.tag == table_row:
+            line = " | ".join(c for c in rows.pop() if c)
+            if cells:
+                cells[-1].append(line)
+            elif line:
+                yield line
+            elem.clear()
+
 
+def iter_docx_text(file_path: str | bytes):
+    """
+    Yields text blocks from a DOCX (path or bytes) by streaming its XML parts
+    directly from the zip: headers first, then the body (including tables), then footers.
+    """
+    source = io.BytesIO(file_path) if isinstance(file_path, (bytes, bytearray, memoryview)) else file_path
+    with zipfile.ZipFile(source) as archive:
+        names = archive.namelist()
+        parts = (sorted(n for n in names if re.fullmatch(r"word/header\d*\.xml", n))
+                 + ["word/document.xml"]
+                 + sorted(n for n in names if re.fullmatch(r"word/footer\d*\.xml", n)))
+        for part in parts:
+            with archive.open(part) as xml_stream:
+                yield from _iter_docx_part(xml_stream)
 
-def extract_text_from_docx(file_path: str) -> str | None:
-    """Extracts text from a DOCX file."""
+
+def extract_text_from_docx(file_path: str | bytes, max_chars: int = MAX_RESUME_CHARS) -> str | None:
+    """
+    Extracts text from a DOCX file (path or bytes), including tables, headers and footers.
+    Stops reading once max_chars characters have been collected.
+    """
     try:
-        doc = docx.Document(file_path)
-        text = "\n".join([para.text for para in doc.paragraphs if para.text])
-        print(f"python-docx extracted {len(text)} characters.")
+        parts = []
+        total = 0
+        for block in iter_docx_text(file_path):
+            parts.append(block)
+            total += len(block) + 1
+            if total >= max_chars:
+                print(f"Reached the {max_chars} character budget. Skipping the rest of the document.")
+                break
+        text = "\n".join(parts)
+        print(f"DOCX reader extracted {len(text)} characters.")
         return text
     except FileNotFoundError:
         print(f"Error: DOCX file not found at {file_path}")
         return None
     except Exception as e:
-        print(f"Error reading DOCX file {file_path}: {e}")
+        print(f"Error reading DOCX file {_describe_source(file_path)}: {e}")
         return None
 
 
-def parse_resume(file_path: str) -> str | None:
+def parse_resume(file_path: str, use_cache: bool = True) -> str | None:
     """
-    Parses resume file (PDF or DOCX).
-    For PDFs, tries PyMuPDF first, then falls back to OCR if text is minimal.
+    Parses resume file (PDF or DOCX) from disk.
+    The file is read once and parsed in memory via parse_resume_bytes.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            file_bytes = f.read()
+    except FileNotFoundError:
+        print(f"Error: Resume file not found at {file_path}")
+        return None
+    except Exception as e:
+        print(f"Error reading resume file {file_path}: {e}")
+        return None
+
+    return parse_resume_bytes(file_bytes, file_path, use_cache=use_cache)
+
+
+def parse_resume_bytes(file_bytes: bytes, filename: str, use_cache: bool = True) -> str | None:
+    """
+    Parses an in-memory resume (PDF or DOCX) without touching the filesystem.
+    The file type is taken from the filename's extension.
+    Results are cached on disk by file content and parser settings, so
+    re-uploading the same resume skips extraction and OCR entirely. Degraded
+    parses (OCR unavailable, failed or timed out on some page) are not cached.
+    """
+    _, file_extension = os.path.splitext(filename)
+    file_extension = file_extension.lower()
+
+    if not use_cache:
+        return _parse_resume_uncached(file_bytes, file_extension, filename)[0]
+
+    settings = dict(get_parser_settings(), extension=file_extension)
+    cache_key = resume_cache.make_key(file_bytes, settings)
+    cached_text = resume_cache.get(cache_key)
+    if cached_text is not None:
+        print(f"Resume served from cache ({len(cached_text)} characters). Cache stats: {resume_cache.stats()}")
+        return cached_text
+
+    text, complete = _parse_resume_uncached(file_bytes, file_extension, filename)
+    if text and complete:
+        resume_cache.put(cache_key, text)
+    elif text:
+        print("Resume parse is incomplete (OCR failed on some pages); not caching it.")
+    return text
+
+
+def _parse_resume_uncached(file_bytes: bytes, file_extension: str, filename: str) -> tuple[str | None, bool]:
+    """
+    Parses resume bytes (PDF or DOCX) without consulting the cache.
+    For PDFs in 'hybrid' mode, each page uses its text layer or OCR as needed;
+    in 'fallback' mode, tries PyMuPDF first, then OCRs the whole document if text is minimal.
+    Returns (text, complete); complete is False if OCR was needed but failed for some page.
     """
-    _, file_extension = os.path.splitext(file_path)
     text = None
+    complete = True
 
-    print(f"Attempting to parse resume: {file_path}")
+    print(f"Attempting to parse resume: {filename}")
 
-    if file_extension.lower() == ".pdf":
+    if file_extension == ".pdf" and PDF_EXTRACTION_MODE == "hybrid":
+        text, complete = extract_text_from_pdf_hybrid(file_bytes)
+
+    elif file_extension == ".pdf":
         # Try PyMuPDF first
-        text = extract_text_from_pdf_pymupdf(file_path)
+        text = extract_text_from_pdf_pymupdf(file_bytes)
 
         # If PyMuPDF fails or gets very little text, try OCR
         if not text or len(text.strip()) < MIN_TEXT_LENGTH_THRESHOLD:
             print(f"Initial PDF text extraction yielded minimal text ({len(text or '')} chars). Falling back to OCR.")
-            text_ocr = ocr_pdf(file_path)
+            text_ocr, complete = ocr_pdf(file_bytes)
             # Prefer OCR text only if it's significantly longer/better
             if text_ocr and len(text_ocr.strip()) > len(text or "".strip()):
                  print("Using OCR result as it seems more complete.")
@@ -119,17 +533,17 @@ def parse_resume(file_path: str) -> str | None:
                  print("OCR attempt failed or yielded no text.")
                  # Stick with original text, even if short
 
-    elif file_extension.lower() == ".docx":
-        text = extract_text_from_docx(file_path)
+    elif file_extension == ".docx":
+        text = extract_text_from_docx(file_bytes)
     else:
         print(f"Error: Unsupported file type '{file_extension}'. Please use PDF or DOCX.")
-        return None
+        return None, False
 
     if text and len(text.strip()) > 0:
         print(f"Resume parsed successfully. Total characters: {len(text)}")
         # Basic cleaning (optional)
         text = '\n'.join(line.strip() for line in text.splitlines() if line.strip())
-        return text
+        return text[:MAX_RESUME_CHARS], complete
     else:
         print("Failed to extract meaningful text from resume after all attempts.")
-        return None # Return None if even OCR fails or gets nothing substantial
\ No newline at end of file
+        return None, False # Return None if even OCR fails or gets nothing substantial
@@ -0,0 +1,134 @@
+import json
+import re
+import threading
+from collections import defaultdict
+from typing import Callable
+
+from core.llm_service import generate_completion, evict_cached_completion, is_error_response, PRIORITY_INTERACTIVE
+from prompts.structured_prompts import get_json_repair_prompt
+from utils.config import LLM_JSON_MODE, LLM_JSON_REPAIR_RETRIES
+
+# Per-kind outcome counters (e.g. "questions", "feedback"), for tracking how often output needs repair
+_stats = defaultdict(lambda: {"ok": 0, "parse_failures": 0, "repaired": 0, "gave_up": 0, "llm_errors": 0})
+_stats_lock = threading.Lock()
+
+
+class StructuredOutputError(ValueError):
+    """Raised when model output is not valid JSON or does not match the expected shape."""
+
+
+def _record(kind: str, outcome: str):
+    with _stats_lock:
+        _stats[kind][outcome] += 1
+
+
+def structured_output_stats() -> dict:
+    """Returns outcome counters per output kind for the current process."""
+    with _stats_lock:
+        return {kind: dict(counts) for kind, counts in _stats.items()}
+
+
+def parse_json_object(raw: str) -> dict:
+    """Parses model output as one JSON object, tolerating a surrounding markdown fence."""
+    text = raw.strip()
+    fence = re.fullmatch(r"```(?:json)?\s*(.*?)\s*```", text, re.DOTALL)
+    if fence:
+        text = fence.group(1)
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"the response is not valid JSON ({e})")
+    if not isinstance(value, dict):
+        raise StructuredOutputError("the response must be a JSON object")
+    return value
+
+
+def require_text(obj: dict, key: str) -> str:
+    """Returns obj[key] as text. A list of strings is accepted and rendered as bullet points."""
+    value = obj.get(key)
+    if isinstance(value, list) and value and all(isinstance(item, str) for item in value):
+        value = "\n".join(f"- {item.strip()}" for item in value)
+    if not isinstance(value, str) or not value.strip():
+        raise StructuredOutputError(f'"{key}" must be a non-empty string')
+    return value.strip()
+
+
+def require_score(value, label: str) -> int:
+    """Validates a 0-10 integer score (integral floats and numeric strings are accepted)."""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value.strip())
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 10:
+        raise StructuredOutputError(f"{label} must be an integer from 0 to 10")
+    return value
+
+
+def partial_json_string(raw: str, key: str) -> str:
+    """
+    Best-effort value of a string field in JSON that is still streaming in,
+    e.g. '{"overall_feedback": "Good expl' -> 'Good expl'. Returns "" if the field hasn't started.
+    """
+    match = re.search(rf'"{re.escape(key)}"\s*:\s*"((?:[^"\\]|\\.)*)', raw)
+    if not match:
+        return ""
+    body = match.group(1)
+    try:
+        return json.loads(f'"{body}"')
+    except json.JSONDecodeError:
+        # Cut off inside an escape sequence such as \u00
+        body = body[:body.rfind("\\")]
+        try:
+            return json.loads(f'"{body}"')
+        except json.JSONDecodeError:
+            return body
+
+
+def resolve_structured(raw: str, prompt: str | list[dict], validate: Callable[[dict], object], kind: str,
+                       max_tokens: int | None = None, temperature: float = 0.7, priority: int = PRIORITY_INTERACTIVE,
+                       repair_retries: int = LLM_JSON_REPAIR_RETRIES):
+    """
+    Validates a completion already obtained for `prompt` in a single pass. If it is invalid,
+    asks the model to repair it, up to repair_retries extra calls.
+    kind is also the routing task (see MODEL_ROUTES), which picks the model and default max_tokens.
+    Returns validate(parsed) or None if the output is unusable or the LLM call failed.
+    """
+    for attempt in range(repair_retries + 1):
+        if is_error_response(raw):
+            print(f"Structured {kind} generation failed: {raw}")
+            _record(kind, "llm_errors")
+            return None
+        try:
+            value = validate(parse_json_object(raw))
+        except StructuredOutputError as e:
+            _record(kind, "parse_failures")
+            if attempt == 0:
+                # Don't let the cache keep serving output we know is unusable
+                evict_cached_completion(prompt, max_tokens=max_tokens, temperature=temperature, json_mode=LLM_JSON_MODE,
+                                        task=kind)
+            if attempt == repair_retries:
+                print(f"Invalid {kind} output ({e}); repair budget exhausted.")
+                break
+            print(f"Invalid {kind} output ({e}). Asking for a repair ({attempt + 1}/{repair_retries}).")
+            messages = prompt if isinstance(prompt, list) else [{"role": "user", "content": prompt}]
+            raw = generate_completion(get_json_repair_prompt(messages, raw, str(e)), max_tokens=max_tokens,
+                                      temperature=0.0, priority=priority, json_mode=LLM_JSON_MODE, task=kind)
+            continue
+        _record(kind, "repaired" if attempt else "ok")
+        return value
+
+    _record(kind, "gave_up")
+    return None
+
+
+def generate_structured(prompt: str | list[dict], validate: Callable[[dict], object], kind: str,
+                        max_tokens: int | None = None, temperature: float = 0.7, priority: int = PRIORITY_INTERACTIVE,
+                        repair_retries: int = LLM_JSON_REPAIR_RETRIES):
+    """
+    Requests JSON output for `prompt` and returns it validated by `validate`, which receives the
+    parsed object and raises StructuredOutputError if it doesn't have the expected shape.
+    Returns None if no valid output was obtained within the repair budget.
+    """
+    raw = generate_completion(prompt, max_tokens=max_tokens, temperature=temperature, priority=priority,
+                              json_mode=LLM_JSON_MODE, task=kind)
+    return resolve_structured(raw, prompt, validate, kind, max_tokens, temperature, priority, repair_retries)
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable
+
+import numpy as np
+import speech_recognition as sr
+
+from utils.config import SPEECH_SAMPLE_RATE, STT_TIMEOUT_SECONDS, VOSK_MODEL_PATH
+
+# name -> backend class, filled in by @register_stt_backend
+_STT_BACKENDS = {}
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def register_stt_backend(name: str):
+    """Class decorator that makes a backend available to get_stt_backend under `name`."""
+    def decorator(cls):
+        cls.name = name
+        _STT_BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def get_stt_backend(name: str) -> "STTBackend":
+    """Returns the shared instance of the named backend, creating it on first use."""
+    with _instances_lock:
+        if name not in _instances:
+            if name not in _STT_BACKENDS:
+                raise ValueError(f"Unknown STT backend '{name}'. Available: {', '.join(sorted(_STT_BACKENDS))}")
+            _instances[name] = _STT_BACKENDS[name]()
+        return _instances[name]
+
+
+def available_stt_backends() -> list[str]:
+    return sorted(_STT_BACKENDS)
+
+
+class STTBackend:
+    """
+    Base class for speech-to-text engines.
+
+    Subclasses implement _transcribe (and optionally _transcribe_stream for engines
+    that can emit partial results). transcribe() and transcribe_stream() wrap them
+    with the same latency and failure accounting so engines can be compared on the
+    same recordings.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.latencies = deque(maxlen=500) # Seconds, most recent calls
+        self._metrics_lock = threading.Lock()
+
+    def _transcribe(self, audio: sr.AudioData) -> str | None:
+        raise NotImplementedError
+
+    def _transcribe_stream(self, chunks: Iterable[bytes], sample_rate: int,
+                           on_partial: Callable[[str], None] | None) -> str | None:
+        return self._transcribe(sr.AudioData(b"".join(chunks), sample_rate, 2))
+
+    def _timed(self, transcribe: Callable[..., str | None], *args) -> str | None:
+        """Runs one transcription, recording its latency, and a failure if it produced no text."""
+        start = time.perf_counter()
+        text = None
+        try:
+            text = transcribe(*args)
+            return text
+        finally:
+            with self._metrics_lock:
+                self.calls += 1
+                self.latencies.append(time.perf_counter() - start)
+                if not text:
+                    self.failures += 1
+
+    def transcribe(self, audio: sr.AudioData) -> str | None:
+        """Returns the transcript, or None if the audio could not be understood."""
+        return self._timed(self._transcribe, audio)
+
+    def transcribe_stream(self, chunks: Iterable[bytes], sample_rate: int = SPEECH_SAMPLE_RATE,
+                          on_partial: Callable[[str], None] | None = None) -> str | None:
+        """
+        Transcribes 16-bit mono PCM arriving in chunks. Engines without streaming
+        support buffer the chunks and transcribe once at the end (no partials).
+        """
+        return self._timed(self._transcribe_stream, chunks, sample_rate, on_partial)
+
+    def metrics(self) -> dict:
+        """Call counts and latency percentiles (milliseconds) for this backend."""
+        with self._metrics_lock:
+            latencies = np.array(self.latencies) * 1000 if self.latencies else None
+            return {
+                "backend": self.name,
+                "calls": self.calls,
+                "failures": self.failures,
+                "mean_ms": float(latencies.mean()) if latencies is not None else None,
+                "p50_ms": float(np.percentile(latencies, 50)) if latencies is not None else None,
+                "p95_ms": float(np.percentile(latencies, 95)) if latencies is not None else None,
+            }
+
+
+@register_stt_backend("google")
+class GoogleSTTBackend(STTBackend):
+    """Google Web Speech API through SpeechRecognition (network)."""
+
+    def __init__(self, timeout: float = STT_TIMEOUT_SECONDS):
+        super().__init__()
+        self.recognizer = sr.Recognizer()
+        self.recognizer.operation_timeout = timeout
+
+    def _transcribe(self, audio: sr.AudioData) -> str | None:
+        try:
+            return self.recognizer.recognize_google(audio)
+        except sr.UnknownValueError:
+            print("❓ Google Speech Recognition could not understand audio")
+            return None
+        except sr.RequestError as e:
+            print(f"Could not request results from Google Speech Recognition service; {e}")
+            return None
+
+
+@register_stt_backend("vosk")
+class VoskSTTBackend(STTBackend):
+    """
+    Offline recognizer using Vosk (pip install vosk, plus a model from alphacephei.com/vosk/models
+    unpacked at VOSK_MODEL_PATH). Supports streaming partial results.
+    """
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH):
+        super().__init__()
+        self.model_path = model_path
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    def _get_model(self):
+        with self._model_lock:
+            if self._model is None:
+                try:
+                    import vosk
+                except ImportError:
+                    raise RuntimeError("The 'vosk' package is required for the vosk STT backend (pip install vosk).")
+                vosk.SetLogLevel(-1)
+                self._model = vosk.Model(self.model_path)
+            return self._model
+
+    def _new_recognizer(self, sample_rate: int):
+        import vosk
+        return vosk.KaldiRecognizer(self._get_model(), sample_rate)
+
+    def _transcribe(self, audio: sr.AudioData) -> str | None:
+        recognizer = self._new_recognizer(SPEECH_SAMPLE_RATE)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=SPEECH_SAMPLE_RATE, convert_width=2))
+        return json.loads(recognizer.FinalResult()).get("text") or None
+
+    def _transcribe_stream(self, chunks: Iterable[bytes], sample_rate: int,
+                           on_partial: Callable[[str], None] | None) -> str | None:
+        recognizer = self._new_recognizer(sample_rate)
+        finished = []
+        for chunk in chunks:
+            if recognizer.AcceptWaveform(chunk):
+                finished.append(json.loads(recognizer.Result()).get("text", ""))
+            elif on_partial:
+                partial = json.loads(recognizer.PartialResult()).get("partial", "")
+                on_partial(" ".join(t for t in finished + [partial] if t))
+        finished.append(json.loads(recognizer.FinalResult()).get("text", ""))
+        return " ".join(t for t in finished if t) or None
+
+
+@register_stt_backend("fake")
+class FakeSTTBackend(STTBackend):
+    """
+    Deterministic stand-in for tests and load experiments: no network, no model.
+    Returns queued responses in order if any were given, otherwise a transcript
+    derived from the audio length and a hash of its bytes.
+    """
+
+    def __init__(self, responses: list[str | None] | None = None, delay: float = 0.0):
+        super().__init__()
+        self.responses = deque(responses or [])
+        self.delay = delay
+
+    def _transcribe(self, audio: sr.AudioData) -> str | None:
+        if self.delay:
+            time.sleep(self.delay)
+        if self.responses:
+            return self.responses.popleft()
+        raw = audio.get_raw_data()
+        seconds = len(raw) / (audio.sample_rate * audio.sample_width)
+        return f"fake transcript {seconds:.1f}s {hashlib.sha256(raw).hexdigest()[:8]}"
+
+    def _transcribe_stream(self, chunks: Iterable[bytes], sample_rate: int,
+                           on_partial: Callable[[str], None] | None) -> str | None:
+        received = []
+        for chunk in chunks:
+            received.append(chunk)
+            if on_partial:
+                on_partial(f"fake partial {len(received)}")
+        return self._transcribe(sr.AudioData(b"".join(received), sample_rate, 2))
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from core.disk_cache import DiskLRUCache
+from utils.config import TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_MEMORY_CACHE_MAX_BYTES, TTS_OUTPUT_FORMAT
+
+
+class TTSCache:
+    """Two-tier, content-addressed cache of synthesized speech.
+
+    The in-memory tier is an LRU bounded by total audio bytes; the on-disk
+    tier is a DiskLRUCache with one file per clip, so rendered phrases
+    survive restarts. Disk hits are promoted into memory.
+    """
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_disk_bytes: int = TTS_CACHE_MAX_BYTES,
+                 max_memory_bytes: int = TTS_MEMORY_CACHE_MAX_BYTES, output_format: str = TTS_OUTPUT_FORMAT):
+        # ElevenLabs formats are '<codec>_<sample rate>[_<bitrate>]', e.g. mp3_44100_128 or pcm_16000
+        self._disk = DiskLRUCache(cache_dir, max_disk_bytes, extension=output_format.split("_")[0], label="TTS")
+        self.max_memory_bytes = max_memory_bytes
+        self.memory_hits = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, model: str, voice_settings: dict) -> str:
+        """Builds the cache key from everything that changes the rendered audio."""
+        payload = json.dumps(
+            {"text": text, "voice_id": voice_id, "model": model, "settings": voice_settings},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, audio: bytes):
+        """Adds audio to the memory tier, evicting least recently used clips. Caller holds the lock."""
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key: str) -> bytes | None:
+        """Returns cached audio bytes, or None on a miss."""
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+
+            audio = self._disk.get(key)
+            if audio is not None:
+                self._remember(key, audio)
+            return audio
+
+    def put(self, key: str, audio: bytes):
+        """Stores audio in both tiers."""
+        with self._lock:
+            self._remember(key, audio)
+            self._disk.put(key, audio)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for the current process."""
+        disk = self._disk.stats()
+        lookups = self.memory_hits + disk["hits"] + disk["misses"]
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": disk["hits"],
+            "misses": disk["misses"],
+            "disk_evictions": disk["evictions"],
+            "memory_bytes": self._memory_bytes,
+            "hit_rate": (self.memory_hits + disk["hits"]) / lookups if lookups else 0.0,
+        }
+
+
+tts_cache = TTSCache()
@@ -1,43 +1,55 @@
-def get_feedback_prompt(resume_text: str, round_name: str, qa_pairs: list[dict], scoring_criteria: str = None) -> str:
-    """Creates a prompt to generate feedback and scores."""
+from prompts.system_prompts import get_interviewer_messages
 
+
+def _criteria_override(scoring_criteria: str | None) -> str:
     if not scoring_criteria:
-        scoring_criteria = """
-        Score each answer out of 10 based on the following criteria:
-        1. Relevance: How well does the answer address the question? (0-3 points)
-        2. Clarity: How clear and concise is the answer? (0-2 points)
-        3. Detail/Examples: Does the answer provide sufficient detail or examples (like STAR method where applicable)? (0-3 points)
-        4. Resume Alignment: How well does the answer align with the candidate's resume? (0-2 points)
-        """
+        return ""
+    return f"\nScore with these criteria instead of the default ones:\n{scoring_criteria.strip()}\n"
+
 
+def get_feedback_prompt(resume_context: str, round_name: str, qa_pairs: list[dict], scoring_criteria: str = None) -> list[dict]:
+    """Creates the messages to generate feedback and scores for a whole round."""
     formatted_qa = "\n".join([f"Q: {item['question']}\nA: {item['answer']}" for item in qa_pairs])
 
-    prompt = f"""
-    You are an expert interviewer providing feedback on a mock interview.
-    The interview was for the '{round_name}' round.
-    The candidate's resume is provided below for context.
-    Analyze the following question and answer pairs from the interview.
-
-    Resume Context:
-    ---
-    {resume_text}
-    ---
-
-    Interview Questions and Answers:
-    ---
-    {formatted_qa}
-    ---
-
-    Instructions:
-    1. Provide overall constructive feedback for the candidate's performance in this round. Focus on strengths and areas for improvement.
-    2. Give specific suggestions for improvement based on their answers.
-    3. Score each answer individually based on the provided criteria.
-    4. Calculate a total score for the round (sum of individual scores).
-    5. Format the output clearly, starting with Overall Feedback, then Suggestions, then a list of scores per question, and finally the Total Score.
-
-    Scoring Criteria (per question, max 10 points):
-    {scoring_criteria}
-
-    Generate the feedback and scores now:
-    """
-    return prompt
\ No newline at end of file
+    request = f"""Give feedback on the candidate's '{round_name}' round. Questions and answers:
+---
+{formatted_qa}
+---
+
+Instructions:
+1. Provide overall constructive feedback for the candidate's performance in this round. Focus on strengths and areas for improvement.
+2. Give specific suggestions for improvement based on their answers.
+3. Score each answer individually (out of 10).
+{_criteria_override(scoring_criteria)}
+Respond with a single JSON object in exactly this format, with one score per question in order:
+{{"overall_feedback": "<feedback>", "suggestions": "<suggestions>", "scores": [<Q1 score>, <Q2 score>, ...]}}"""
+    return get_interviewer_messages(resume_context, request)
+
+
+def get_answer_scoring_prompt(resume_context: str, round_name: str, question: str, answer: str, scoring_criteria: str = None) -> list[dict]:
+    """Creates the messages to score a single answer as soon as it is given."""
+    request = f"""Score one answer from the candidate's '{round_name}' round (out of 10).
+
+Question: {question}
+Answer: {answer}
+{_criteria_override(scoring_criteria)}
+Respond with a single JSON object in exactly this format:
+{{"score": <integer from 0 to 10>, "comment": "<one or two sentences on the main strength or weakness>"}}"""
+    return get_interviewer_messages(resume_context, request)
+
+
+def get_round_summary_prompt(resume_context: str, round_name: str, scored_answers: list[dict]) -> list[dict]:
+    """Creates short messages that summarize a round whose answers were already scored."""
+    formatted = "\n".join(
+        f"Q{i+1}: {item['question']}\nA: {item['answer']}\nScore: {item['score']}/10 - {item['comment']}"
+        for i, item in enumerate(scored_answers)
+    )
+
+    request = f"""Give feedback on the candidate's '{round_name}' round. Each answer has already been scored; do not re-score them.
+---
+{formatted}
+---
+
+Respond with a single JSON object in exactly this format:
+{{"overall_feedback": "<a short paragraph on strengths and areas for improvement>", "suggestions": "<specific, actionable suggestions based on the answers>"}}"""
+    return get_interviewer_messages(resume_context, request)
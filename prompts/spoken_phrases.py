@@ -0,0 +1,26 @@
+# Fixed lines spoken by the interviewer. Kept in one place so the TTS warm-up
+# renders exactly the strings that are later spoken (the audio cache is keyed on text).
+
+NEXT_QUESTION = "Okay, thank you. Next question."
+NO_RESPONSE = "I didn't catch that. Let's move to the next question."
+ROUND_COMPLETE = "Thank you. That concludes the questions for this round."
+ROUND_COMPLETE_WITH_FEEDBACK = "Thank you. That concludes the questions for this round. I will now prepare your feedback."
+
+
+def get_round_welcome(round_name: str, num_questions: int) -> str:
+    """Welcome line used by the console agent at the start of a round."""
+    return f"Welcome to the {round_name} round. I will ask you {num_questions} questions based on your resume. Please answer clearly after I finish speaking."
+
+
+def get_app_round_welcome(round_name: str, num_questions: int) -> str:
+    """Welcome line used by the Streamlit app at the start of a round."""
+    return f"Welcome to the {round_name} round. I will ask you {num_questions} questions. Let's begin with the first question."
+
+
+def get_stock_phrases(rounds: list[dict]) -> list[str]:
+    """Every fixed phrase, including the welcome lines for each round, for TTS warm-up."""
+    phrases = [NEXT_QUESTION, NO_RESPONSE, ROUND_COMPLETE, ROUND_COMPLETE_WITH_FEEDBACK]
+    for round_info in rounds:
+        phrases.append(get_round_welcome(round_info['name'], round_info['num_questions']))
+        phrases.append(get_app_round_welcome(round_info['name'], round_info['num_questions']))
+    return phrases
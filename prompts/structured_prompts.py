@@ -0,0 +1,10 @@
+def get_json_repair_prompt(original_messages: list[dict], invalid_output: str, error: str) -> list[dict]:
+    """
+    Creates the messages asking the model to fix a response that failed validation.
+    The original conversation is replayed unchanged, so the repair call shares its cached prefix.
+    """
+    return original_messages + [
+        {"role": "assistant", "content": invalid_output},
+        {"role": "user", "content": f"That response could not be used: {error}\n"
+                                    "Respond again with only the corrected JSON object, in exactly the requested format."},
+    ]
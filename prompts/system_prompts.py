@@ -0,0 +1,28 @@
+# Shared prefix for every interview LLM call. The system message holds the fixed
+# instructions and the candidate's resume, so it is byte-identical for all calls
+# on a resume (questions for every round, scoring, feedback) and providers can
+# reuse their prompt cache for it. Anything that varies per call goes in the
+# user message after it. Keep this text free of timestamps, counters or other
+# per-call values. OpenAI only caches prompts of 1024 tokens or more, so the
+# prefix must reach that size (see RESUME_CONTEXT_TOKEN_BUDGET) to benefit; short
+# resumes stay below it and are simply not cached.
+
+DEFAULT_SCORING_CRITERIA = """1. Relevance: How well does the answer address the question? (0-3 points)
+2. Clarity: How clear and concise is the answer? (0-2 points)
+3. Detail/Examples: Does the answer provide sufficient detail or examples (like STAR method where applicable)? (0-3 points)
+4. Resume Alignment: How well does the answer align with the candidate's resume? (0-2 points)"""
+
+INTERVIEWER_INSTRUCTIONS = f"""You are an expert interviewer conducting a mock job interview with the candidate whose resume is below.
+Depending on the request you generate interview questions, score the candidate's answers, or give constructive feedback on a round.
+Always respond with a single JSON object in exactly the format the request asks for, with no other text.
+
+When scoring, score each answer out of 10 using these criteria unless the request gives others:
+{DEFAULT_SCORING_CRITERIA}"""
+
+
+def get_interviewer_messages(resume_context: str, request: str) -> list[dict]:
+    """Builds the chat messages for an interview task: the shared system prefix, then the task itself."""
+    return [
+        {"role": "system", "content": f"{INTERVIEWER_INSTRUCTIONS}\n\nCandidate Resume:\n---\n{resume_context}\n---"},
+        {"role": "user", "content": request},
+    ]
@@ -17,4 +17,87 @@ if not ELEVENLABS_API_KEY:
 RECORDING_SAMPLE_RATE = 44100
 RECORDING_CHANNELS = 1
 RECORDING_DURATION_SECONDS = 10 
-TEMP_AUDIO_FILENAME = "data/recordings/temp_user_response.wav"
\ No newline at end of file
+
+# Resume parsing cache
+RESUME_CACHE_DIR = os.getenv("RESUME_CACHE_DIR", "data/cache/resumes")
+RESUME_CACHE_MAX_BYTES = int(os.getenv("RESUME_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+# LLM response cache (opt-in)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/cache/llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+
+# LLM client pooling
+LLM_MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", 8))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", 60))
+
+# LLM rate limiting and retries
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 500))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 200000))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 1.0))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 30.0))
+LLM_COALESCE_REQUESTS = os.getenv("LLM_COALESCE_REQUESTS", "true").lower() in ("1", "true", "yes") # Share one call between identical concurrent requests
+
+# LLM endpoint and model routing (see MODEL_ROUTES in core/llm_service.py)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None # Point at an OpenAI-compatible stand-in server; unset uses the default endpoint
+LLM_DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "gpt-4o-mini") # Supports automatic prompt caching (gpt-3.5-turbo does not)
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gpt-4.1-mini") # Used when the primary model fails, and for hedged requests
+LLM_QUESTIONS_MODEL = os.getenv("LLM_QUESTIONS_MODEL", LLM_DEFAULT_MODEL)
+LLM_FEEDBACK_MODEL = os.getenv("LLM_FEEDBACK_MODEL", LLM_DEFAULT_MODEL)
+LLM_SCORING_MODEL = os.getenv("LLM_SCORING_MODEL", LLM_DEFAULT_MODEL) # Per-answer scores and round summaries
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes") # Send a second request when a call runs slow
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95)) # Latency percentile (per task and model) after which to hedge
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20)) # Latencies to observe before hedging starts
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", 1.0)) # Never hedge sooner than this
+
+# Synthesized speech cache
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "data/cache/tts")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+TTS_MEMORY_CACHE_MAX_BYTES = int(os.getenv("TTS_MEMORY_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+TTS_PREFETCH_LOOKAHEAD = int(os.getenv("TTS_PREFETCH_LOOKAHEAD", 2)) # Questions rendered ahead of the current one
+TTS_PREFETCH_WORKERS = int(os.getenv("TTS_PREFETCH_WORKERS", 2))
+TTS_STREAMING_ENABLED = os.getenv("TTS_STREAMING_ENABLED", "true").lower() in ("1", "true", "yes") # Sentence-chunked playback
+TTS_CHUNK_MAX_CHARS = int(os.getenv("TTS_CHUNK_MAX_CHARS", 200))
+TTS_CHUNK_MIN_CHARS = int(os.getenv("TTS_CHUNK_MIN_CHARS", 25))
+TTS_CHUNK_WORKERS = int(os.getenv("TTS_CHUNK_WORKERS", 3))
+TTS_OUTPUT_FORMAT = os.getenv("TTS_OUTPUT_FORMAT", "mp3_44100_128") # Compressed, so clips can be sent to the browser
+INTERVIEWER_AUDIO_DELIVERY = os.getenv("INTERVIEWER_AUDIO_DELIVERY", "browser") # 'browser' (st.audio) or 'server' (local speaker)
+
+# Answer recording with voice-activity endpointing
+RECORDING_MAX_SECONDS = float(os.getenv("RECORDING_MAX_SECONDS", 90))
+VAD_TRAILING_SILENCE_SECONDS = float(os.getenv("VAD_TRAILING_SILENCE_SECONDS", 2.0)) # Quiet time that ends an answer
+VAD_START_TIMEOUT_SECONDS = float(os.getenv("VAD_START_TIMEOUT_SECONDS", 10)) # Give up if nobody starts speaking
+VAD_ENERGY_THRESHOLD = float(os.getenv("VAD_ENERGY_THRESHOLD", 0.01)) # Minimum RMS (float32 samples) counted as speech
+VAD_NOISE_MULTIPLIER = float(os.getenv("VAD_NOISE_MULTIPLIER", 3.0))
+VAD_FRAME_SECONDS = 0.03
+SPEECH_SAMPLE_RATE = 16000 # Answers are converted to 16 kHz mono int16 before transcription
+SAVE_DEBUG_RECORDINGS = os.getenv("SAVE_DEBUG_RECORDINGS", "false").lower() in ("1", "true", "yes")
+DEBUG_RECORDINGS_DIR = os.getenv("DEBUG_RECORDINGS_DIR", "data/recordings")
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", 3))
+
+# Speech-to-text
+STT_BACKEND = os.getenv("STT_BACKEND", "google") # 'google' (network), 'vosk' (offline) or 'fake' (tests)
+STT_TIMEOUT_SECONDS = float(os.getenv("STT_TIMEOUT_SECONDS", 15))
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "data/models/vosk-model-small-en-us-0.15")
+
+# Feedback
+FEEDBACK_MODE = os.getenv("FEEDBACK_MODE", "incremental") # 'incremental' (score each answer on submit) or 'round' (one call at the end)
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", 4))
+
+# Structured (JSON) LLM output
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "true").lower() in ("1", "true", "yes") # Ask the API for JSON-constrained output
+LLM_JSON_REPAIR_RETRIES = int(os.getenv("LLM_JSON_REPAIR_RETRIES", 1)) # Extra calls allowed to fix invalid output
+
+# Resume digest (a budgeted selection of resume sections is sent to the LLM instead of the raw text).
+# The resume context plus ~200 tokens of instructions form the shared system prefix; OpenAI only caches
+# prompts of at least 1024 tokens, so a budget much below ~850 means the prefix can never be cached.
+RESUME_CONTEXT_TOKEN_BUDGET = int(os.getenv("RESUME_CONTEXT_TOKEN_BUDGET", 1500))
+
+# Question bank
+QUESTION_BANK_MODE = os.getenv("QUESTION_BANK_MODE", "record") # 'off', 'record' (bank generated questions) or 'serve' (assemble rounds from the bank, LLM tops up)
+QUESTION_BANK_PATH = os.getenv("QUESTION_BANK_PATH", "data/cache/question_bank.sqlite3")
+QUESTION_BANK_VECTOR_SIMILARITY = os.getenv("QUESTION_BANK_VECTOR_SIMILARITY", "true").lower() in ("1", "true", "yes")
+QUESTION_BANK_DUPLICATE_SIMILARITY = float(os.getenv("QUESTION_BANK_DUPLICATE_SIMILARITY", 0.9)) # Cosine similarity above which questions count as duplicates